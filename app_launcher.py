@@ -5,7 +5,22 @@ import subprocess
 import ctypes
 import time
 import re
+import select
 import base64
+import functools
+import hashlib
+import hmac
+import queue
+import secrets
+import signal
+import socket
+import socketserver
+import sqlite3
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 # 检查是否安装了必要的包，如果没有则尝试导入备用模块
@@ -16,24 +31,92 @@ except ImportError:
 
 try:
     from win32com.client import Dispatch
+    import pythoncom
     import pywintypes
 except ImportError:
     Dispatch = None
+    pythoncom = None
     pywintypes = None
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel, 
     QFileDialog, QSystemTrayIcon, QMenu, QAction, QScrollArea, QFrame, QSizePolicy, QMessageBox, 
     QAbstractItemView, QTableWidget, QTableWidgetItem, QHeaderView, QStyle, QStyleOptionButton, 
-    QCheckBox, QDialog
+    QCheckBox, QDialog, QFileIconProvider
 )
-from PyQt5.QtCore import Qt, QSize, QThread, pyqtSignal, QTimer, QPoint, QRect
-from PyQt5.QtGui import QIcon, QPalette, QColor, QFont, QPainter, QBrush, QPen, QPixmap
+from PyQt5.QtCore import (
+    Qt, QSize, QThread, pyqtSignal, QTimer, QPoint, QRect, QObject, QFileInfo, QBuffer, QIODevice, QEvent
+)
+from PyQt5.QtGui import QIcon, QPalette, QColor, QFont, QPainter, QBrush, QPen, QPixmap, QImage
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
 
 # 内嵌的图标数据 (base64编码的ICO文件)
 APP_ICON_DATA = """AAABAAEAEBAAAAAAAABoBQAAFgAAACgAAAAQAAAAIAAAAAEACAAAAAAAAAEAAAAAAAAAAAAAAAEAAAAAAAABAAAAACAAAAAEAAEAAAAAAAEAEAAAAAAQAAAQAAAAAAAAEAAAAAAAAAAAAAAAAP//AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A////AP///wD///8A"""
 
 
+# 全局设置默认值，保存在配置文件的settings字段中
+DEFAULT_SETTINGS = {
+    # 延后启动: 系统持续空闲多久(秒)后开始启动，最多等待多久(秒)
+    "deferred_idle_seconds": 10,
+    "deferred_max_delay": 120,
+    # 空闲判定阈值: CPU占用百分比、磁盘读写速度(MB/s)
+    "deferred_cpu_threshold": 30.0,
+    "deferred_disk_threshold": 10.0,
+    # 启动顺序: config(按配置顺序) / slowest_first(按历史启动耗时从慢到快)
+    #           critical_path(按自身加上依赖它的程序的最长耗时链从长到短)
+    "launch_order": "config",
+    # 同时处于启动中(尚未识别到进程)的程序数上限，0表示不限制，-1表示按系统CPU占用自动放行
+    "launch_concurrency": 0,
+    # 隐藏到托盘时销毁主窗口控件以节省内存，再次显示时重建
+    "low_memory_tray": False,
+    # 本机状态接口端口(只监听127.0.0.1)，0表示关闭；CPU/内存等数据的采样间隔(秒)
+    "metrics_port": 0,
+    "metrics_interval": 10,
+    # 启动前在后台把程序文件和上次加载过的DLL预读进系统缓存，预读总量上限(MB)
+    "prefetch_enabled": False,
+    "prefetch_budget_mb": 512,
+}
+
+CONFIG_FILE = "launcher_config.json"
+HISTORY_FILE = "launch_history.db"
+PLAN_FILE = "launcher_plan.json"
+PREFETCH_FILE = "prefetch_manifest.json"
+
+# 单实例通信使用的本地套接字名称
+INSTANCE_SERVER_NAME = "onekey_startup_launcher"
+
+# 命令行参数 -> 转发给已运行实例的命令
+INSTANCE_COMMANDS = {
+    "--show": "show",
+    "--launch": "launch",
+    "--close": "close",
+}
+
+def parse_instance_command(argv):
+    """从命令行参数中取出要执行的命令，默认显示窗口"""
+    for arg in argv[1:]:
+        if arg in INSTANCE_COMMANDS:
+            return INSTANCE_COMMANDS[arg]
+    return "show"
+
+def connect_to_running_instance(timeout=300):
+    """连接已运行实例的单实例服务，没有实例在监听时返回None；需要先创建QApplication"""
+    client = QLocalSocket()
+    client.connectToServer(INSTANCE_SERVER_NAME)
+    if not client.waitForConnected(timeout):
+        return None
+    return client
+
+def send_to_running_instance(command, timeout=300):
+    """尝试把命令发送给已运行的实例，成功返回True"""
+    client = connect_to_running_instance(timeout)
+    if client is None:
+        return False
+    client.write((command + "\n").encode("utf-8"))
+    client.waitForBytesWritten(timeout)
+    client.disconnectFromServer()
+    return True
+
 # 检查管理员权限
 def is_admin():
     """检查当前是否具有管理员权限"""
@@ -77,6 +160,1500 @@ def get_app_icon():
     # 如果所有方法都失败，返回默认图标
     return QApplication.style().standardIcon(QStyle.SP_ComputerIcon)
 
+def resolve_program_target(path):
+    """解析程序实际目标路径，快捷方式返回其指向的文件"""
+    return read_shortcut(path)[0]
+
+def read_shortcut(path):
+    """返回 (目标路径, 启动参数, 工作目录)；不是快捷方式或无法解析时原样返回路径"""
+    if path.lower().endswith('.lnk') and Dispatch:
+        try:
+            shortcut = Dispatch("WScript.Shell").CreateShortCut(path)
+            if shortcut.TargetPath:
+                return shortcut.TargetPath, shortcut.Arguments or "", shortcut.WorkingDirectory or None
+        except:
+            pass
+    return path, "", None
+
+def inspect_program_path(file_path):
+    """解析程序路径，返回 (是否UWP应用, UWP进程名, 实际目标路径)"""
+    if file_path.lower().endswith('.lnk') and Dispatch:
+        try:
+            shell = Dispatch("WScript.Shell")
+            target_path = shell.CreateShortCut(file_path).TargetPath
+            # UWP应用通常有AppX标记或没有.exe扩展名
+            if "AppX" in target_path or not target_path.lower().endswith('.exe'):
+                # 从快捷方式文件名提取UWP应用名称
+                return True, os.path.splitext(os.path.basename(file_path))[0], target_path or file_path
+            return False, None, target_path
+        except:
+            pass
+    return False, None, file_path
+
+# 进程来源，默认为psutil；压力测试时替换为合成的进程表
+PROCESS_SOURCE = None
+
+def process_iter(attrs):
+    return (PROCESS_SOURCE or psutil).process_iter(attrs)
+
+def get_process(pid):
+    return (PROCESS_SOURCE or psutil).Process(pid)
+
+def find_program_processes(target, process_name=None, since=None):
+    """查找与目标路径(或进程名)匹配的进程，since用于只返回此时间之后创建的进程"""
+    found = []
+    if not psutil:
+        return found
+    target = os.path.normcase(os.path.abspath(target)) if target else None
+    name = process_name.lower() if process_name else None
+    for proc in process_iter(['pid', 'name', 'exe', 'create_time']):
+        try:
+            info = proc.info
+            if since is not None and (info['create_time'] or 0) < since:
+                continue
+            exe = info['exe']
+            if target and exe and os.path.normcase(exe) == target:
+                found.append(proc)
+            elif name and info['name'] and name in info['name'].lower():
+                found.append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return found
+
+def process_children_map():
+    """遍历一次进程表，返回 {父进程PID: [子进程]}"""
+    children = {}
+    if not psutil:
+        return children
+    for proc in process_iter(['pid', 'ppid']):
+        try:
+            children.setdefault(proc.info['ppid'], []).append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return children
+
+def snapshot_processes():
+    """获取一次进程快照，返回 {pid: (name, exe)}"""
+    snapshot = {}
+    if not psutil:
+        return snapshot
+    for proc in process_iter(['pid', 'name', 'exe']):
+        try:
+            info = proc.info
+            snapshot[info['pid']] = (info['name'] or "", info['exe'])
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return snapshot
+
+def match_snapshot(snapshot, target=None, process_name=None, pids=()):
+    """在进程快照中查找正在运行的程序：优先匹配已跟踪的PID，再按路径或进程名匹配"""
+    target = os.path.normcase(os.path.abspath(target)) if target else None
+    name = process_name.lower() if process_name else None
+    
+    def matches(proc_name, exe):
+        if target and exe:
+            return os.path.normcase(exe) == target
+        return bool(name) and name in proc_name.lower()
+    
+    found = []
+    for pid in pids:
+        entry = snapshot.get(pid)
+        # 跟踪的PID可能已被系统复用，无法读取路径时才直接认可
+        if entry and (entry[1] is None or matches(*entry)):
+            found.append(pid)
+    if found:
+        return found
+    return [pid for pid, entry in snapshot.items() if matches(*entry)]
+
+def find_process_window(pids):
+    """返回指定进程的第一个可见顶层窗口句柄(仅Windows)，没有时返回None"""
+    try:
+        user32 = ctypes.windll.user32
+    except AttributeError:
+        return None
+    pids = set(pids)
+    found = []
+    
+    def callback(hwnd, _):
+        if user32.IsWindowVisible(hwnd) and not user32.GetWindow(hwnd, 4):  # GW_OWNER
+            owner = ctypes.c_ulong()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(owner))
+            if owner.value in pids:
+                found.append(hwnd)
+                return False
+        return True
+    
+    enum_proc = ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_void_p, ctypes.c_void_p)
+    user32.EnumWindows(enum_proc(callback), 0)
+    return found[0] if found else None
+
+def focus_process_window(pids):
+    """将指定进程的可见顶层窗口切换到前台(仅Windows)，成功返回True"""
+    hwnd = find_process_window(pids)
+    if not hwnd:
+        return False
+    user32 = ctypes.windll.user32
+    if user32.IsIconic(hwnd):
+        user32.ShowWindow(hwnd, 9)  # SW_RESTORE
+    return bool(user32.SetForegroundWindow(hwnd))
+
+def input_idle_state(pid):
+    """查询进程是否已完成初始化并等待用户输入(仅Windows)
+    
+    返回 "idle"(已就绪) / "busy"(仍在初始化) / "none"(没有消息队列，如控制台程序或无法查询)"""
+    try:
+        kernel32 = ctypes.windll.kernel32
+        user32 = ctypes.windll.user32
+    except AttributeError:
+        return "none"
+    # PROCESS_QUERY_INFORMATION | SYNCHRONIZE
+    handle = kernel32.OpenProcess(0x0400 | 0x00100000, False, pid)
+    if not handle:
+        return "none"
+    try:
+        result = user32.WaitForInputIdle(ctypes.c_void_p(handle), 0) & 0xFFFFFFFF
+    finally:
+        kernel32.CloseHandle(handle)
+    if result == 0:
+        return "idle"
+    if result == 0x102:  # WAIT_TIMEOUT
+        return "busy"
+    return "none"
+
+def trim_process_memory():
+    """把本进程已释放的内存归还给系统: Windows缩减工作集，Linux调用malloc_trim"""
+    try:
+        if sys.platform == "win32":
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+            kernel32.SetProcessWorkingSetSize.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t]
+            kernel32.SetProcessWorkingSetSize(kernel32.GetCurrentProcess(), ctypes.c_size_t(-1).value,
+                                              ctypes.c_size_t(-1).value)
+        elif sys.platform.startswith("linux"):
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (AttributeError, OSError):
+        pass
+
+# 进程优先级名称 -> (Windows优先级类常量名, POSIX nice值)
+PRIORITY_LEVELS = {
+    "idle": ("IDLE_PRIORITY_CLASS", 19),
+    "below_normal": ("BELOW_NORMAL_PRIORITY_CLASS", 10),
+    "normal": ("NORMAL_PRIORITY_CLASS", 0),
+    "above_normal": ("ABOVE_NORMAL_PRIORITY_CLASS", -5),
+    "high": ("HIGH_PRIORITY_CLASS", -10),
+    "realtime": ("REALTIME_PRIORITY_CLASS", -20),
+}
+
+# I/O优先级名称 -> (Windows常量名, Linux ioclass常量名, Linux级别)
+IO_PRIORITY_LEVELS = {
+    "very_low": ("IOPRIO_VERYLOW", "IOPRIO_CLASS_IDLE", 0),
+    "low": ("IOPRIO_LOW", "IOPRIO_CLASS_BE", 7),
+    "normal": ("IOPRIO_NORMAL", "IOPRIO_CLASS_BE", 4),
+    "high": ("IOPRIO_HIGH", "IOPRIO_CLASS_BE", 0),
+}
+
+def _priority_value(priority):
+    """将配置中的优先级(名称或nice值)转换为psutil可用的值"""
+    if isinstance(priority, str):
+        level = PRIORITY_LEVELS.get(priority.lower())
+        if not level:
+            return None
+        if sys.platform == "win32":
+            return getattr(psutil, level[0], None)
+        return level[1]
+    if isinstance(priority, int):
+        if sys.platform != "win32":
+            return priority
+        # Windows下按nice值区间映射到优先级类
+        for const, nice in sorted(PRIORITY_LEVELS.values(), key=lambda x: -x[1]):
+            if priority >= nice:
+                return getattr(psutil, const, None)
+        return getattr(psutil, "REALTIME_PRIORITY_CLASS", None)
+    return None
+
+def _affinity_value(affinity):
+    """将配置中的CPU亲和性(核心列表或位掩码)转换为核心列表"""
+    if isinstance(affinity, str):
+        try:
+            affinity = int(affinity, 0)
+        except ValueError:
+            return None
+    if isinstance(affinity, int):
+        return [i for i in range(affinity.bit_length()) if affinity >> i & 1]
+    if isinstance(affinity, (list, tuple)):
+        return [int(cpu) for cpu in affinity]
+    return None
+
+def apply_process_tuning(proc, priority=None, affinity=None, io_priority=None):
+    """为进程应用优先级、CPU亲和性和I/O优先级，返回是否全部成功"""
+    ok = True
+    try:
+        value = _priority_value(priority) if priority is not None else None
+        if value is not None:
+            proc.nice(value)
+    except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError, OSError) as e:
+        print(f"设置进程优先级出错: {e}")
+        ok = False
+    try:
+        cpus = _affinity_value(affinity) if affinity is not None else None
+        if cpus and hasattr(proc, "cpu_affinity"):
+            proc.cpu_affinity(cpus)
+    except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError, OSError) as e:
+        print(f"设置CPU亲和性出错: {e}")
+        ok = False
+    try:
+        level = IO_PRIORITY_LEVELS.get(str(io_priority).lower()) if io_priority is not None else None
+        if level and hasattr(proc, "ionice"):
+            if sys.platform == "win32":
+                proc.ionice(getattr(psutil, level[0]))
+            elif level[1] == "IOPRIO_CLASS_IDLE":
+                proc.ionice(getattr(psutil, level[1]))
+            else:
+                proc.ionice(getattr(psutil, level[1]), level[2])
+    except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError, OSError, AttributeError) as e:
+        print(f"设置I/O优先级出错: {e}")
+        ok = False
+    return ok
+
+# 进程归属容器
+# 启动的程序放入独立的进程组/会话(POSIX)或作业对象(Windows)，程序派生的进程即使脱离了父进程也仍属于该容器。
+# 关闭时对整个容器发一次信号再等待一次，不再逐个遍历进程树；容器也给出程序全部进程的资源统计。
+
+SEE_MASK_NOCLOSEPROCESS = 0x40
+SEE_MASK_NOASYNC = 0x100
+CREATE_SUSPENDED = 0x4
+STARTF_USESHOWWINDOW = 0x1
+JOB_OBJECT_BASIC_ACCOUNTING_INFORMATION = 1
+JOB_OBJECT_BASIC_PROCESS_ID_LIST = 3
+JOB_OBJECT_EXTENDED_LIMIT_INFORMATION = 9
+
+class SHELLEXECUTEINFOW(ctypes.Structure):
+    _fields_ = [
+        ("cbSize", ctypes.c_ulong), ("fMask", ctypes.c_ulong), ("hwnd", ctypes.c_void_p),
+        ("lpVerb", ctypes.c_wchar_p), ("lpFile", ctypes.c_wchar_p), ("lpParameters", ctypes.c_wchar_p),
+        ("lpDirectory", ctypes.c_wchar_p), ("nShow", ctypes.c_int), ("hInstApp", ctypes.c_void_p),
+        ("lpIDList", ctypes.c_void_p), ("lpClass", ctypes.c_wchar_p), ("hkeyClass", ctypes.c_void_p),
+        ("dwHotKey", ctypes.c_ulong), ("hIconOrMonitor", ctypes.c_void_p), ("hProcess", ctypes.c_void_p),
+    ]
+
+class STARTUPINFOW(ctypes.Structure):
+    _fields_ = [
+        ("cb", ctypes.c_ulong), ("lpReserved", ctypes.c_wchar_p), ("lpDesktop", ctypes.c_wchar_p),
+        ("lpTitle", ctypes.c_wchar_p), ("dwX", ctypes.c_ulong), ("dwY", ctypes.c_ulong),
+        ("dwXSize", ctypes.c_ulong), ("dwYSize", ctypes.c_ulong), ("dwXCountChars", ctypes.c_ulong),
+        ("dwYCountChars", ctypes.c_ulong), ("dwFillAttribute", ctypes.c_ulong), ("dwFlags", ctypes.c_ulong),
+        ("wShowWindow", ctypes.c_ushort), ("cbReserved2", ctypes.c_ushort), ("lpReserved2", ctypes.c_void_p),
+        ("hStdInput", ctypes.c_void_p), ("hStdOutput", ctypes.c_void_p), ("hStdError", ctypes.c_void_p),
+    ]
+
+class PROCESS_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        ("hProcess", ctypes.c_void_p), ("hThread", ctypes.c_void_p),
+        ("dwProcessId", ctypes.c_ulong), ("dwThreadId", ctypes.c_ulong),
+    ]
+
+class JOBOBJECT_BASIC_ACCOUNTING_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        ("TotalUserTime", ctypes.c_longlong), ("TotalKernelTime", ctypes.c_longlong),
+        ("ThisPeriodTotalUserTime", ctypes.c_longlong), ("ThisPeriodTotalKernelTime", ctypes.c_longlong),
+        ("TotalPageFaultCount", ctypes.c_ulong), ("TotalProcesses", ctypes.c_ulong),
+        ("ActiveProcesses", ctypes.c_ulong), ("TotalTerminatedProcesses", ctypes.c_ulong),
+    ]
+
+class JOBOBJECT_EXTENDED_LIMIT_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        # JOBOBJECT_BASIC_LIMIT_INFORMATION
+        ("PerProcessUserTimeLimit", ctypes.c_longlong), ("PerJobUserTimeLimit", ctypes.c_longlong),
+        ("LimitFlags", ctypes.c_ulong), ("MinimumWorkingSetSize", ctypes.c_size_t),
+        ("MaximumWorkingSetSize", ctypes.c_size_t), ("ActiveProcessLimit", ctypes.c_ulong),
+        ("Affinity", ctypes.c_size_t), ("PriorityClass", ctypes.c_ulong), ("SchedulingClass", ctypes.c_ulong),
+        # IO_COUNTERS
+        ("ReadOperationCount", ctypes.c_ulonglong), ("WriteOperationCount", ctypes.c_ulonglong),
+        ("OtherOperationCount", ctypes.c_ulonglong), ("ReadTransferCount", ctypes.c_ulonglong),
+        ("WriteTransferCount", ctypes.c_ulonglong), ("OtherTransferCount", ctypes.c_ulonglong),
+        ("ProcessMemoryLimit", ctypes.c_size_t), ("JobMemoryLimit", ctypes.c_size_t),
+        ("PeakProcessMemoryUsed", ctypes.c_size_t), ("PeakJobMemoryUsed", ctypes.c_size_t),
+    ]
+
+def scan_process_groups(pgids):
+    """一次遍历进程表查找多个进程组的成员，返回 {进程组ID: [(pid, CPU秒数)]}；僵尸进程不算在内"""
+    pgids = set(pgids)
+    found = {}
+    if not pgids:
+        return found
+    if os.path.isdir("/proc"):
+        ticks = os.sysconf("SC_CLK_TCK")
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{name}/stat", 'rb') as f:
+                    data = f.read()
+                # 进程名可能含空格和括号，从最后一个')'之后开始: 状态 父进程 进程组 ... utime stime
+                fields = data[data.rindex(b")") + 2:].split()
+                pgid = int(fields[2])
+                if pgid not in pgids or fields[0] == b"Z":
+                    continue
+                found.setdefault(pgid, []).append((int(name), (int(fields[11]) + int(fields[12])) / ticks))
+            except (OSError, ValueError, IndexError):
+                continue
+        return found
+    # 没有/proc的平台(如macOS)直接查询psutil
+    if not psutil:
+        return found
+    for proc in psutil.process_iter(['pid']):
+        try:
+            pgid = os.getpgid(proc.pid)
+            if pgid not in pgids or proc.status() == psutil.STATUS_ZOMBIE:
+                continue
+            times = proc.cpu_times()
+            found.setdefault(pgid, []).append((proc.pid, times.user + times.system))
+        except (OSError, psutil.Error):
+            continue
+    return found
+
+class ProcessGroup:
+    """一个程序的全部进程，pid为最先启动的进程"""
+    
+    def __init__(self, pid):
+        self.pid = pid
+    
+    @staticmethod
+    def launch(path, target=None, arguments="", working_dir=None):
+        """启动程序并放入新的归属容器；程序已启动但无法放入容器时返回None
+        
+        target/arguments/working_dir为启动计划中预先解析的快捷方式内容，没有时现场解析"""
+        if sys.platform == "win32":
+            return WindowsJobGroup.launch(path, target, arguments, working_dir)
+        return PosixProcessGroup.launch(path)
+    
+    def members(self):
+        return []
+    
+    def alive(self):
+        return bool(self.members())
+    
+    def wait_pids(self):
+        """关闭时交给退出监视器等待的进程"""
+        return self.members()
+    
+    def terminate(self):
+        pass
+    
+    def kill(self):
+        self.terminate()
+    
+    def accounting(self, scanned=None):
+        """返回 {"cpu_seconds", "processes", "active_processes", "peak_memory_bytes"}，无法获取的项为None
+        
+        scanned为scan_process_groups()的结果，多个进程组共用一次进程表遍历"""
+        return {}
+    
+    def release(self):
+        pass
+
+class PosixProcessGroup(ProcessGroup):
+    """新会话中的进程组，组ID即首个进程的PID"""
+    
+    def __init__(self, popen):
+        super().__init__(popen.pid)
+        self.popen = popen
+        self.member_cpu = {}    # 上次统计时各成员的CPU秒数
+        self.exited_cpu = 0.0   # 已退出成员的CPU秒数合计
+        self.finished = False   # 进程组已结束，组ID不再属于本程序
+    
+    @classmethod
+    def launch(cls, path):
+        popen = subprocess.Popen([path], start_new_session=True, stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
+        return cls(popen)
+    
+    def alive(self):
+        if self.finished:
+            return False
+        # 首个进程退出后需要回收，否则僵尸进程会让进程组一直存在
+        if self.popen.poll() is None:
+            return True
+        try:
+            os.killpg(self.pid, 0)
+        except ProcessLookupError:
+            # 首个进程已回收且组内没有进程，组ID随时可能被新进程复用，之后不再向它发信号
+            self.finished = True
+            return False
+        except PermissionError:
+            pass
+        return True
+    
+    def wait_pids(self):
+        # 其余成员由关闭时的alive()检查兜底，不为此遍历进程表
+        return [self.pid] if self.popen.poll() is None else []
+    
+    def members(self):
+        return [pid for pid, _ in self.scan()]
+    
+    def scan(self):
+        """查找本组中的进程，返回 [(pid, CPU秒数)]；已退出但尚未回收的进程不算在内"""
+        self.popen.poll()
+        return scan_process_groups([self.pid]).get(self.pid, [])
+    
+    def signal(self, sig):
+        if not self.alive():
+            return
+        try:
+            os.killpg(self.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    def terminate(self):
+        self.signal(signal.SIGTERM)
+    
+    def kill(self):
+        self.signal(signal.SIGKILL)
+    
+    def accounting(self, scanned=None):
+        if scanned is None:
+            members = self.scan()
+        else:
+            self.popen.poll()
+            members = scanned.get(self.pid, [])
+        cpu = dict(members)
+        # 已退出成员最后一次统计到的CPU时间计入累计值，保证总数不会减少
+        self.exited_cpu += sum(seconds for pid, seconds in self.member_cpu.items() if pid not in cpu)
+        self.member_cpu = cpu
+        return {"cpu_seconds": round(self.exited_cpu + sum(cpu.values()), 2), "processes": None,
+                "active_processes": len(members), "peak_memory_bytes": None}
+    
+    def release(self):
+        self.popen.poll()
+
+class WindowsJobGroup(ProcessGroup):
+    """作业对象，程序派生的子进程自动加入同一作业"""
+    
+    def __init__(self, pid, job):
+        super().__init__(pid)
+        self.job = job
+        self.kernel32 = ctypes.windll.kernel32
+    
+    @classmethod
+    def launch(cls, path, target=None, arguments="", working_dir=None):
+        kernel32 = ctypes.windll.kernel32
+        kernel32.CreateJobObjectW.restype = ctypes.c_void_p
+        kernel32.AssignProcessToJobObject.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        kernel32.GetProcessId.argtypes = [ctypes.c_void_p]
+        kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+        kernel32.ResumeThread.argtypes = [ctypes.c_void_p]
+        kernel32.ResumeThread.restype = ctypes.c_ulong
+        kernel32.TerminateProcess.argtypes = [ctypes.c_void_p, ctypes.c_uint]
+        
+        # 本程序已是管理员时直接创建进程(继承管理员权限)，否则只能通过runas提权
+        command = cls.command_line(path, target, arguments, working_dir) if is_admin() else None
+        if command is None:
+            return cls.launch_shell(path)
+        job = kernel32.CreateJobObjectW(None, None)
+        if not job:
+            return cls.launch_shell(path)
+        startup = STARTUPINFOW()
+        startup.cb = ctypes.sizeof(startup)
+        startup.dwFlags = STARTF_USESHOWWINDOW
+        startup.wShowWindow = 1
+        info = PROCESS_INFORMATION()
+        # 挂起创建，加入作业后再恢复运行，程序的第一条指令执行前就已属于作业
+        if not kernel32.CreateProcessW(None, ctypes.create_unicode_buffer(command[0]), None, None, False,
+                                       CREATE_SUSPENDED, None, command[1], ctypes.byref(startup), ctypes.byref(info)):
+            error = ctypes.WinError()
+            kernel32.CloseHandle(job)
+            raise error
+        try:
+            if not kernel32.AssignProcessToJobObject(job, info.hProcess):
+                kernel32.CloseHandle(job)
+                job = None
+            if kernel32.ResumeThread(info.hThread) == 0xFFFFFFFF:
+                error = ctypes.WinError()
+                kernel32.TerminateProcess(info.hProcess, 1)
+                raise error
+        finally:
+            kernel32.CloseHandle(info.hThread)
+            kernel32.CloseHandle(info.hProcess)
+        return cls(info.dwProcessId, job) if job else None
+    
+    @staticmethod
+    def command_line(path, target=None, arguments="", working_dir=None):
+        """返回 (命令行, 工作目录)；不是可直接创建进程的exe(或指向exe的快捷方式)时返回None"""
+        if target is None:
+            # 没有启动计划时才读取快捷方式，调用线程需已初始化COM
+            target, arguments, working_dir = read_shortcut(path)
+        if not target.lower().endswith('.exe'):
+            return None
+        command = subprocess.list2cmdline([target])
+        if arguments:
+            command += " " + arguments
+        return command, working_dir or os.path.dirname(target) or None
+    
+    @classmethod
+    def launch_shell(cls, path):
+        """通过ShellExecuteEx(runas)启动，用于需要提权或无法直接创建进程的文件
+        
+        进程启动后才能加入作业，在此之前派生的子进程不属于该作业"""
+        kernel32 = ctypes.windll.kernel32
+        shell32 = ctypes.windll.shell32
+        
+        # 以管理员权限启动，并保留进程句柄
+        info = SHELLEXECUTEINFOW()
+        info.cbSize = ctypes.sizeof(info)
+        info.fMask = SEE_MASK_NOCLOSEPROCESS | SEE_MASK_NOASYNC
+        info.lpVerb = "runas"
+        info.lpFile = path
+        info.nShow = 1
+        if not shell32.ShellExecuteExW(ctypes.byref(info)):
+            raise ctypes.WinError()
+        if not info.hProcess:
+            # 请求被已运行的实例接管，没有新进程
+            return None
+        try:
+            pid = kernel32.GetProcessId(info.hProcess)
+            job = kernel32.CreateJobObjectW(None, None)
+            if not job:
+                return None
+            # 在程序派生子进程前尽早加入作业，之后派生的进程自动属于该作业
+            if not kernel32.AssignProcessToJobObject(job, info.hProcess):
+                kernel32.CloseHandle(job)
+                return None
+            return cls(pid, job)
+        finally:
+            kernel32.CloseHandle(info.hProcess)
+    
+    def query(self, info_class, info):
+        self.kernel32.QueryInformationJobObject.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_ulong, ctypes.c_void_p
+        ]
+        return self.kernel32.QueryInformationJobObject(
+            self.job, info_class, ctypes.byref(info), ctypes.sizeof(info), None
+        )
+    
+    def members(self):
+        class ProcessIdList(ctypes.Structure):
+            _fields_ = [("NumberOfAssignedProcesses", ctypes.c_ulong),
+                        ("NumberOfProcessIdsInList", ctypes.c_ulong),
+                        ("ProcessIdList", ctypes.c_size_t * 1024)]
+        info = ProcessIdList()
+        if not self.job or not self.query(JOB_OBJECT_BASIC_PROCESS_ID_LIST, info):
+            return []
+        return list(info.ProcessIdList[:info.NumberOfProcessIdsInList])
+    
+    def terminate(self):
+        if self.job:
+            self.kernel32.TerminateJobObject.argtypes = [ctypes.c_void_p, ctypes.c_uint]
+            self.kernel32.TerminateJobObject(self.job, 1)
+    
+    def accounting(self, scanned=None):
+        basic = JOBOBJECT_BASIC_ACCOUNTING_INFORMATION()
+        extended = JOBOBJECT_EXTENDED_LIMIT_INFORMATION()
+        if not self.job or not self.query(JOB_OBJECT_BASIC_ACCOUNTING_INFORMATION, basic):
+            return {}
+        peak = extended.PeakJobMemoryUsed if self.query(JOB_OBJECT_EXTENDED_LIMIT_INFORMATION, extended) else None
+        return {
+            # 时间单位为100纳秒
+            "cpu_seconds": round((basic.TotalUserTime + basic.TotalKernelTime) / 1e7, 2),
+            "processes": basic.TotalProcesses,
+            "active_processes": basic.ActiveProcesses,
+            "peak_memory_bytes": peak,
+        }
+    
+    def release(self):
+        # 作业未设置关闭即结束，释放句柄不影响其中的进程
+        if self.job:
+            self.kernel32.CloseHandle(self.job)
+            self.job = None
+
+# 图标磁盘缓存
+class IconCache:
+    """按(解析后路径, 修改时间, 文件大小)缓存图标PNG，超出容量时淘汰最久未使用的条目"""
+    
+    def __init__(self, cache_dir="icon_cache", max_bytes=8 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.index = {}  # key -> [字节数, 最近使用时间]
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            pass
+    
+    @staticmethod
+    def key_for(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        raw = f"{os.path.normcase(os.path.abspath(path))}|{stat.st_mtime_ns}|{stat.st_size}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.index.get(key)
+            if not entry:
+                return None
+            try:
+                with open(os.path.join(self.cache_dir, key + ".png"), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                del self.index[key]
+                self.dirty = True
+                return None
+            entry[1] = time.time()
+            self.dirty = True
+            return data
+    
+    def put(self, key, data):
+        with self.lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(os.path.join(self.cache_dir, key + ".png"), 'wb') as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"写入图标缓存出错: {e}")
+                return
+            self.index[key] = [len(data), time.time()]
+            self.dirty = True
+            self.evict()
+    
+    def evict(self):
+        total = sum(entry[0] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, key + ".png"))
+            except OSError:
+                pass
+            total -= entry[0]
+            del self.index[key]
+    
+    def flush(self):
+        """把索引写回磁盘"""
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(self.index_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.index, f)
+                self.dirty = False
+            except OSError as e:
+                print(f"保存图标缓存索引出错: {e}")
+
+# 图标加载线程
+# QIcon/QPixmap/QFileIconProvider只能在GUI线程使用，本线程只处理QImage:
+# 解析快捷方式、读取缓存的PNG，缓存未命中时交给GUI线程提取图标，再把结果编码写入缓存。
+class IconLoader(QThread):
+    icon_loaded = pyqtSignal(str, QImage)  # path, image(失败时为空图像)
+    icon_needed = pyqtSignal(str, str, str)  # path, 实际文件, 缓存键
+    
+    ICON_SIZE = 32
+    
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.queue = queue.Queue()
+    
+    def run(self):
+        if pythoncom:
+            pythoncom.CoInitialize()
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                if item[0] == "store":
+                    self.store_icon(item[1], item[2])
+                else:
+                    self.load_icon(item[1])
+            except Exception as e:
+                print(f"加载程序图标出错: {e}")
+                if item[0] == "load":
+                    self.icon_loaded.emit(item[1], QImage())
+            # 队列空闲时再写索引，避免每个图标都写一次磁盘
+            if self.queue.empty():
+                self.cache.flush()
+        self.cache.flush()
+    
+    def load_icon(self, path):
+        source = resolve_program_target(path)
+        if not os.path.exists(source):
+            source = path
+        key = self.cache.key_for(source)
+        if key is None:
+            self.icon_loaded.emit(path, QImage())
+            return
+        image = QImage()
+        data = self.cache.get(key)
+        if data and image.loadFromData(data, "PNG"):
+            self.icon_loaded.emit(path, image)
+        else:
+            self.icon_needed.emit(path, source, key)
+    
+    def store_icon(self, key, image):
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, "PNG")
+        self.cache.put(key, bytes(buffer.data()))
+    
+    def stop(self):
+        self.queue.put(None)
+
+# 程序图标服务，供程序行、托盘菜单和进程选择对话框共用
+class IconProvider(QObject):
+    def __init__(self, cache_dir="icon_cache", parent=None):
+        super().__init__(parent)
+        self.icons = {}    # path -> QIcon，加载失败时为None
+        self.pending = {}  # path -> 等待图标的 [(receiver, callback)]
+        self.file_icons = None  # QFileIconProvider，只在GUI线程创建和使用
+        self.loader = IconLoader(IconCache(cache_dir))
+        self.loader.icon_loaded.connect(self.on_icon_loaded)
+        self.loader.icon_needed.connect(self.on_icon_needed)
+        self.loader.start()
+    
+    def icon(self, path):
+        """返回已加载的图标，未加载时返回None"""
+        return self.icons.get(path)
+    
+    def request(self, path, callback, receiver=None):
+        """异步获取图标，加载完成后在GUI线程调用callback(icon)
+        
+        receiver为请求方QObject，销毁前调用cancel(receiver)丢弃其尚未完成的回调"""
+        if not path:
+            return
+        if path in self.icons:
+            if self.icons[path] is not None:
+                callback(self.icons[path])
+            return
+        if path in self.pending:
+            self.pending[path].append((receiver, callback))
+            return
+        self.pending[path] = [(receiver, callback)]
+        self.loader.queue.put(("load", path))
+    
+    def cancel(self, receiver):
+        """丢弃receiver尚未完成的所有请求"""
+        for callbacks in self.pending.values():
+            callbacks[:] = [item for item in callbacks if item[0] is not receiver]
+    
+    def on_icon_needed(self, path, source, key):
+        """缓存未命中: 在GUI线程提取图标，编码和写缓存交回加载线程"""
+        if self.file_icons is None:
+            self.file_icons = QFileIconProvider()
+        size = IconLoader.ICON_SIZE
+        image = self.file_icons.icon(QFileInfo(source)).pixmap(size, size).toImage()
+        if not image.isNull():
+            self.loader.queue.put(("store", key, image.copy()))
+        self.on_icon_loaded(path, image)
+    
+    def on_icon_loaded(self, path, image):
+        icon = None if image.isNull() else QIcon(QPixmap.fromImage(image))
+        self.icons[path] = icon
+        for receiver, callback in self.pending.pop(path, []):
+            if icon is None:
+                continue
+            try:
+                callback(icon)
+            except RuntimeError:
+                # 请求图标的控件已被销毁
+                pass
+    
+    def shutdown(self, wait=True):
+        """停止加载线程；wait为False时只发出停止请求，用stopped()查询是否已结束"""
+        self.loader.stop()
+        if wait:
+            self.loader.wait(1000)
+    
+    def stopped(self):
+        return not self.loader.isRunning()
+
+_icon_provider = None
+
+def get_icon_provider():
+    """获取全局共享的图标服务"""
+    global _icon_provider
+    if _icon_provider is None:
+        _icon_provider = IconProvider()
+    return _icon_provider
+
+def percentile(values, pct):
+    """计算已排序数值列表的百分位数(线性插值)"""
+    if not values:
+        return None
+    pos = (len(values) - 1) * pct / 100.0
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+# 启动历史记录
+class LaunchHistory:
+    """用SQLite记录每次启动和关闭的耗时，供统计和启动顺序调度使用"""
+    
+    def __init__(self, db_file="launch_history.db"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS launches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    started REAL NOT NULL,
+                    ready_seconds REAL,
+                    pid INTEGER
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS closes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    started REAL NOT NULL,
+                    duration REAL NOT NULL,
+                    exit_code INTEGER
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_launches_path ON launches(path, started)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_closes_path ON closes(path, started)")
+    
+    def record_launch(self, path, started, ready_seconds, pid=None):
+        """记录一次启动，ready_seconds为启动到出现窗口/等待输入的耗时，None表示超时未就绪"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO launches (path, started, ready_seconds, pid) VALUES (?, ?, ?, ?)",
+                (path, started, ready_seconds, pid)
+            )
+    
+    def record_close(self, path, started, duration, exit_code=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO closes (path, started, duration, exit_code) VALUES (?, ?, ?, ?)",
+                (path, started, duration, exit_code)
+            )
+    
+    def startup_stats(self, path=None, limit=50):
+        """返回 {path: {"count", "p50", "p95", "mean"}}，只统计每个程序最近limit次成功启动"""
+        query = "SELECT path, ready_seconds FROM launches WHERE ready_seconds IS NOT NULL"
+        params = ()
+        if path:
+            query += " AND path = ?"
+            params = (path,)
+        query += " ORDER BY started DESC"
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        samples = {}
+        for row_path, seconds in rows:
+            values = samples.setdefault(row_path, [])
+            if len(values) < limit:
+                values.append(seconds)
+        stats = {}
+        for row_path, values in samples.items():
+            values.sort()
+            stats[row_path] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "mean": sum(values) / len(values),
+            }
+        return stats
+    
+    def startup_trend(self, path, days=30):
+        """按天返回 [(日期, 平均启动耗时, 次数)]"""
+        since = time.time() - days * 86400
+        with self.lock:
+            return self.conn.execute("""
+                SELECT date(started, 'unixepoch', 'localtime') AS day, AVG(ready_seconds), COUNT(*)
+                FROM launches
+                WHERE path = ? AND started >= ? AND ready_seconds IS NOT NULL
+                GROUP BY day ORDER BY day
+            """, (path, since)).fetchall()
+    
+    def close_stats(self, path):
+        """返回某程序的关闭次数和平均关闭耗时"""
+        with self.lock:
+            count, mean = self.conn.execute(
+                "SELECT COUNT(*), AVG(duration) FROM closes WHERE path = ?", (path,)
+            ).fetchone()
+        return {"count": count, "mean": mean}
+    
+    def order_slowest_first(self, rows):
+        """按历史启动耗时中位数从慢到快排序，没有记录的程序保持原顺序排在最后"""
+        stats = self.startup_stats()
+        return sorted(rows, key=lambda row: -(stats.get(row.get_program_path(), {}).get("p50") or 0))
+    
+    def order_critical_path(self, rows):
+        """按关键路径长度从长到短排序，没有记录的程序耗时按0计算"""
+        stats = self.startup_stats()
+        programs = [{"path": row.get_program_path(),
+                     "duration": stats.get(row.get_program_path(), {}).get("p50") or 0,
+                     "depends_on": row.depends_on} for row in rows]
+        lengths = critical_path_lengths(programs)
+        return sorted(rows, key=lambda row: -lengths[row.get_program_path()])
+    
+    def order_rows(self, rows, launch_order):
+        """按launch_order设置排列启动顺序"""
+        if launch_order == "slowest_first":
+            return self.order_slowest_first(rows)
+        if launch_order == "critical_path":
+            return self.order_critical_path(rows)
+        return rows
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# 程序数据模型
+class ProgramEntry:
+    """一个受管理程序的配置和运行状态，不依赖界面控件，可在工作线程中使用"""
+    
+    # 保存到配置文件的字段及默认值
+    CONFIG_FIELDS = {
+        "path": "",
+        "is_uwp": False,
+        "process_name": None,
+        "selected_process": None,
+        # 调度设置: 优先级(名称或nice值)、CPU亲和性(核心列表或位掩码)、I/O优先级
+        "priority": None,
+        "cpu_affinity": None,
+        "io_priority": None,
+        # 程序已在运行时的处理方式: skip(跳过) / focus(切换到前台) / new(仍启动新实例)
+        "if_running": "skip",
+        # 启动优先级: normal(立即启动) / deferred(关键程序启动后等系统空闲再启动)
+        "launch_priority": "normal",
+        # 依赖的其他程序路径，这些程序就绪后才启动本程序
+        "depends_on": [],
+    }
+    
+    def __init__(self, **fields):
+        for name, default in self.CONFIG_FIELDS.items():
+            value = fields.get(name, default)
+            setattr(self, name, list(value) if isinstance(value, list) else value)
+        self.running = False
+        self.pending = False        # 是否在延后启动队列中等待
+        self.status_text = None     # 状态栏显示的文字，重建界面时恢复
+        self.launched_pids = set()  # 启动后识别到的进程PID
+        self.tuned_pids = set()     # 已应用调度设置的进程PID
+        self.launch_count = 0       # 本次运行中识别到启动的次数
+        self.last_launch_seconds = None  # 最近一次启动到程序就绪的耗时
+        self.groups = []            # 每次启动创建的进程归属容器(ProcessGroup)
+        self.clear_plan()
+    
+    def prune_groups(self):
+        """释放并移除已结束的进程归属容器"""
+        groups = []
+        for group in self.groups:
+            if group.alive():
+                groups.append(group)
+            else:
+                group.release()
+        self.groups = groups
+    
+    @classmethod
+    def from_config(cls, item):
+        return cls(**{k: v for k, v in item.items() if k in cls.CONFIG_FIELDS and v is not None})
+    
+    def to_config(self):
+        return {name: getattr(self, name) for name in self.CONFIG_FIELDS}
+    
+    def clear_plan(self):
+        """清除启动计划编译出的字段，之后启动时现场推导"""
+        self.target = None
+        self.arguments = ""
+        self.working_dir = None
+        self.spawn = None
+        self.level = None
+        self.ready_timeout = None
+    
+    def get_program_path(self):
+        return self.path.strip()
+    
+    def is_valid(self):
+        path = self.get_program_path()
+        return bool(path) and os.path.exists(path)
+    
+    def has_tuning(self):
+        """是否配置了优先级/亲和性/I/O优先级"""
+        return any(v is not None for v in (self.priority, self.cpu_affinity, self.io_priority))
+    
+    def apply_tuning(self, proc):
+        """对进程应用调度设置"""
+        if proc.pid in self.tuned_pids:
+            return
+        apply_process_tuning(proc, self.priority, self.cpu_affinity, self.io_priority)
+        self.tuned_pids.add(proc.pid)
+
+def dependency_levels(entries):
+    """按depends_on计算每个程序的依赖层级 {path: level}，没有依赖的为0"""
+    by_path = {entry.get_program_path(): entry for entry in entries}
+    levels = {}
+    
+    def level(path, seen):
+        if path in levels:
+            return levels[path]
+        if path in seen:
+            # 循环依赖，按没有依赖处理
+            return 0
+        deps = [dep for dep in by_path[path].depends_on if dep in by_path]
+        levels[path] = max((level(dep, seen | {path}) + 1 for dep in deps), default=0)
+        return levels[path]
+    
+    for path in by_path:
+        level(path, frozenset())
+    return levels
+
+def launch_levels(entries):
+    """把程序按依赖层级分组，保持组内原有顺序；已编译计划的层级直接使用"""
+    if all(entry.level is not None for entry in entries):
+        levels = {entry.get_program_path(): entry.level for entry in entries}
+    else:
+        levels = dependency_levels(entries)
+    groups = {}
+    for entry in entries:
+        groups.setdefault(levels[entry.get_program_path()], []).append(entry)
+    return [groups[level] for level in sorted(groups)]
+
+# 预编译启动计划
+# 保存配置时把目标路径解析、启动方式、依赖层级和就绪检测设置一并写入计划文件，
+# 启动时直接执行；加载时按文件修改时间和大小校验，任一文件变化则丢弃计划。
+PLAN_VERSION = 2
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def compile_launch_plan(entries, config_file, ready_timeout):
+    """把有效程序编译为启动计划"""
+    valid = [entry for entry in entries if entry.is_valid()]
+    levels = dependency_levels(valid)
+    steps = []
+    for entry in valid:
+        path = entry.get_program_path()
+        target, arguments, working_dir = (None, "", None) if entry.is_uwp else read_shortcut(path)
+        steps.append({
+            "path": path,
+            "target": target,
+            "arguments": arguments,
+            "working_dir": working_dir,
+            "spawn": "startfile" if entry.is_uwp else "runas",
+            "level": levels[path],
+            "ready_timeout": ready_timeout,
+            "signature": _file_signature(path),
+            "target_signature": _file_signature(target),
+        })
+    return {"version": PLAN_VERSION, "config_signature": _file_signature(config_file), "steps": steps}
+
+def load_launch_plan(plan_file, config_file, entries):
+    """读取并校验启动计划，有效时把编译结果写入entries并按计划顺序返回，否则返回None"""
+    try:
+        with open(plan_file, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if plan.get("version") != PLAN_VERSION or plan.get("config_signature") != _file_signature(config_file):
+        return None
+    
+    by_path = {entry.get_program_path(): entry for entry in entries if entry.get_program_path()}
+    ordered = []
+    for step in plan.get("steps", []):
+        entry = by_path.pop(step["path"], None)
+        if entry is None or step["signature"] is None or _file_signature(step["path"]) != step["signature"]:
+            return None
+        if step["target"] and _file_signature(step["target"]) != step["target_signature"]:
+            return None
+        ordered.append((entry, step))
+    # 计划之外又出现了有效程序，说明计划已过期
+    if any(entry.is_valid() for entry in by_path.values()):
+        return None
+    
+    for entry, step in ordered:
+        entry.target = step["target"]
+        entry.arguments = step["arguments"]
+        entry.working_dir = step["working_dir"]
+        entry.spawn = step["spawn"]
+        entry.level = step["level"]
+        entry.ready_timeout = step["ready_timeout"]
+    return [entry for entry, _ in ordered]
+
+def read_config_file(config_file):
+    """读取配置文件，返回 (settings, programs)，兼容只有程序列表的旧版格式"""
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    settings = dict(DEFAULT_SETTINGS)
+    if isinstance(config, dict):
+        settings.update(config.get("settings", {}))
+        config = config.get("programs", [])
+    return settings, config
+
+# 启动计划模拟器
+# 用记录的启动耗时离线重放不同调度策略，估算全部程序就绪所需时间。
+# 程序启动争用同一份系统资源：同时启动的程序数超过capacity时按比例变慢。
+# 启动中的程序对系统的负载按剩余比例计算，越接近就绪占用越少。
+
+def simulate_launch(programs, limit=None, order=None, strict=False, capacity=4.0, spawn_gap=0.5, adaptive=False):
+    """模拟一次启动，返回 (全部就绪时间, {path: 就绪时间})
+
+    programs: [{"path", "duration", "depends_on"}]
+    limit: 同时处于启动中的程序数上限，None表示不限制(当前LaunchThread的行为)
+    order: 启动顺序(路径列表)，默认按programs顺序
+    strict: 是否严格按顺序逐个启动(排在前面的依赖未就绪时后面的也不启动)
+    adaptive: 按负载放行，只有当前负载加上新程序不超过capacity时才启动下一个
+    """
+    durations = {p["path"]: max(p["duration"], 0.0) for p in programs}
+    depends = {p["path"]: [d for d in p.get("depends_on") or [] if d in durations] for p in programs}
+    pending = list(order or [p["path"] for p in programs])
+    remaining = dict(durations)
+    active = []
+    ready_at = {}
+    now = 0.0
+    next_spawn = 0.0
+    
+    def next_candidate():
+        for path in pending:
+            if all(dep in ready_at for dep in depends[path]):
+                return path
+            if strict:
+                return None
+        return None
+    
+    def load():
+        return sum(remaining[p] / durations[p] for p in active if durations[p] > 0)
+    
+    while pending or active:
+        can_admit = limit is None or len(active) < limit
+        # 负载过高: 等到负载降下来能容纳一个新程序时再放行
+        overloaded = adaptive and active and load() + 1 > capacity + 1e-9
+        candidate = next_candidate() if can_admit and not overloaded else None
+        if candidate is not None and now >= next_spawn:
+            pending.remove(candidate)
+            active.append(candidate)
+            next_spawn = now + spawn_gap
+            continue
+        
+        rate = min(1.0, capacity / len(active)) if active else 0.0
+        dt_finish = min(remaining[p] for p in active) / rate if active else float("inf")
+        dt_spawn = next_spawn - now if candidate is not None else float("inf")
+        dt_admit = float("inf")
+        if overloaded and can_admit and next_candidate() is not None:
+            drain = rate * sum(1 / durations[p] for p in active if durations[p] > 0)
+            if drain > 0:
+                dt_admit = (load() + 1 - capacity) / drain
+        dt = min(dt_finish, dt_spawn, dt_admit)
+        if dt == float("inf"):
+            # 依赖无法满足(循环依赖或依赖不在启动集合中)
+            break
+        for path in active:
+            remaining[path] -= dt * rate
+        now += dt
+        for path in active[:]:
+            if remaining[path] <= 1e-9:
+                active.remove(path)
+                ready_at[path] = now
+    
+    makespan = max(ready_at.values()) if len(ready_at) == len(durations) and ready_at else float("inf")
+    return makespan, ready_at
+
+def critical_path_lengths(programs):
+    """计算每个程序加上所有依赖它的后续程序的最长耗时链"""
+    durations = {p["path"]: p["duration"] for p in programs}
+    dependents = {path: [] for path in durations}
+    for p in programs:
+        for dep in p.get("depends_on") or []:
+            if dep in dependents:
+                dependents[dep].append(p["path"])
+    lengths = {}
+    
+    def length(path, seen=()):
+        if path in lengths:
+            return lengths[path]
+        if path in seen:
+            return 0.0
+        tail = max((length(child, seen + (path,)) for child in dependents[path]), default=0.0)
+        lengths[path] = durations[path] + tail
+        return lengths[path]
+    
+    for path in durations:
+        length(path)
+    return lengths
+
+def load_startup_durations(trace_file=None, history=None):
+    """从跟踪文件或启动历史读取每个程序的启动耗时(秒)
+
+    跟踪文件格式: {"path": 秒数或[多次采样]} 或 [{"path": ..., "seconds": ...}]
+    """
+    durations = {}
+    if trace_file:
+        with open(trace_file, 'r', encoding='utf-8') as f:
+            trace = json.load(f)
+        samples = {}
+        if isinstance(trace, dict):
+            for path, value in trace.items():
+                samples[path] = value if isinstance(value, list) else [value]
+        else:
+            for record in trace:
+                samples.setdefault(record["path"], []).append(record["seconds"])
+        for path, values in samples.items():
+            durations[path] = percentile(sorted(float(v) for v in values), 50)
+    elif history:
+        for path, stats in history.startup_stats().items():
+            durations[path] = stats["p50"]
+    return durations
+
+def build_simulation_plans(programs, max_parallel):
+    """生成要比较的调度方案: [(名称, 对应设置, simulate_launch参数)]"""
+    config_order = [p["path"] for p in programs if not p.get("is_uwp")]
+    config_order += [p["path"] for p in programs if p.get("is_uwp")]
+    # 与LaunchHistory.order_slowest_first/order_critical_path一致: 没有耗时记录的程序按0排序
+    recorded = {p["path"]: p["duration"] if p.get("recorded", True) else 0 for p in programs}
+    longest_first = sorted(config_order, key=lambda path: -recorded[path])
+    paths = critical_path_lengths([dict(p, duration=recorded[p["path"]]) for p in programs])
+    critical_first = sorted(config_order, key=lambda path: -paths[path])
+    
+    plans = [("serial (当前行为)", {"launch_order": "config", "launch_concurrency": 0},
+              {"order": config_order, "strict": True})]
+    for n in range(1, max_parallel + 1):
+        plans.append((f"parallel-{n}", {"launch_order": "config", "launch_concurrency": n},
+                      {"order": config_order, "limit": n}))
+        plans.append((f"longest-first-{n}", {"launch_order": "slowest_first", "launch_concurrency": n},
+                      {"order": longest_first, "limit": n}))
+        plans.append((f"critical-path-{n}", {"launch_order": "critical_path", "launch_concurrency": n},
+                      {"order": critical_first, "limit": n}))
+    # launch_concurrency为-1时LaunchThread按系统CPU占用放行，对应模拟中的按负载放行
+    plans.append(("load-adaptive", {"launch_order": "critical_path", "launch_concurrency": -1},
+                  {"order": critical_first, "adaptive": True}))
+    return plans
+
+def run_simulation(config_file, trace_file=None, max_parallel=4, capacity=None, history_file=None, output=None):
+    """命令行模拟入口，打印各方案预计的全部就绪时间和推荐设置"""
+    settings, entries = read_config_file(config_file)
+    history = None
+    if not trace_file and history_file and os.path.exists(history_file):
+        history = LaunchHistory(history_file)
+    durations = load_startup_durations(trace_file, history)
+    if history:
+        history.close()
+    
+    known = sorted(durations.values())
+    default = percentile(known, 50) if known else 2.0
+    programs = []
+    for item in entries:
+        path = item.get("path")
+        if not path:
+            continue
+        programs.append({
+            "path": path,
+            "is_uwp": item.get("is_uwp", False),
+            "duration": durations.get(path, default),
+            "recorded": path in durations,
+            "depends_on": item.get("depends_on") or [],
+        })
+    if not programs:
+        print("配置中没有程序")
+        return 1
+    
+    capacity = capacity or float(os.cpu_count() or 4)
+    lines = [f"程序数: {len(programs)}，有耗时记录: {sum(1 for p in programs if p['path'] in durations)}，"
+             f"资源容量: {capacity:g}", ""]
+    results = []
+    for name, plan_settings, kwargs in build_simulation_plans(programs, max_parallel):
+        makespan, _ = simulate_launch(programs, capacity=capacity, **kwargs)
+        results.append((makespan, name, plan_settings))
+        lines.append(f"{name:<24}{makespan:>10.2f} 秒")
+    
+    best = min(results, key=lambda r: r[0])
+    lines.append("")
+    lines.append(f"推荐: {best[1]}，设置 " + json.dumps(best[2], ensure_ascii=False))
+    text = "\n".join(lines)
+    print(text)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    return 0
+
+def run_history_report(history_file, path=None, days=30):
+    """命令行统计入口，打印各程序的启动耗时分位数、每日趋势和关闭耗时"""
+    if not os.path.exists(history_file):
+        print(f"启动历史不存在: {history_file}")
+        return 1
+    history = LaunchHistory(history_file)
+    try:
+        stats = history.startup_stats(path)
+        if not stats:
+            print("没有启动记录")
+            return 1
+        lines = []
+        for row_path, row in sorted(stats.items()):
+            lines.append(os.path.basename(row_path) or row_path)
+            lines.append(f"  启动 {row['count']} 次  p50 {row['p50']:.2f} 秒  p95 {row['p95']:.2f} 秒  平均 {row['mean']:.2f} 秒")
+            closes = history.close_stats(row_path)
+            if closes["count"]:
+                lines.append(f"  关闭 {closes['count']} 次  平均 {closes['mean']:.2f} 秒")
+            for day, mean, count in history.startup_trend(row_path, days):
+                lines.append(f"  {day}  {mean:>8.2f} 秒  ({count} 次)")
+        print("\n".join(lines))
+        return 0
+    finally:
+        history.close()
+
+# 诊断开关
+# 通过命令行参数或环境变量开启，结果写入诊断目录，可直接附加到问题报告:
+#   --profile / LAUNCHER_PROFILE=1           对启动、关闭和进程列表加载做cProfile
+#   --tracemalloc[=点,...] / LAUNCHER_TRACEMALLOC  在指定时间点保存内存快照
+#   --stall-ms=N / LAUNCHER_STALL_MS=N       界面线程卡住超过N毫秒时记录调用栈
+#   --diag-dir=目录 / LAUNCHER_DIAG_DIR       输出目录
+TRACEMALLOC_POINTS = ("startup", "launch", "close", "tray")
+
+DIAGNOSTICS = {
+    "dir": "diagnostics",
+    "profile": False,
+    "tracemalloc": (),   # 需要保存内存快照的时间点
+    "stall_ms": 0,
+}
+
+def parse_diagnostic_options(argv, environ=os.environ):
+    """从命令行参数和环境变量读取诊断开关，命令行优先"""
+    options = {
+        "--profile": environ.get("LAUNCHER_PROFILE"),
+        "--tracemalloc": environ.get("LAUNCHER_TRACEMALLOC"),
+        "--stall-ms": environ.get("LAUNCHER_STALL_MS"),
+        "--diag-dir": environ.get("LAUNCHER_DIAG_DIR"),
+    }
+    for arg in argv[1:]:
+        name, _, value = arg.partition("=")
+        if name in options:
+            options[name] = value or "1"
+    
+    if options["--diag-dir"]:
+        DIAGNOSTICS["dir"] = options["--diag-dir"]
+    DIAGNOSTICS["profile"] = options["--profile"] not in (None, "", "0")
+    points = options["--tracemalloc"]
+    if points and points != "0":
+        if points == "1":
+            DIAGNOSTICS["tracemalloc"] = TRACEMALLOC_POINTS
+        else:
+            DIAGNOSTICS["tracemalloc"] = tuple(p.strip() for p in points.split(",") if p.strip())
+    try:
+        DIAGNOSTICS["stall_ms"] = max(0, int(options["--stall-ms"] or 0))
+    except ValueError:
+        print(f"无效的--stall-ms参数: {options['--stall-ms']}")
+    return DIAGNOSTICS
+
+def diagnostics_file(prefix, suffix):
+    os.makedirs(DIAGNOSTICS["dir"], exist_ok=True)
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"{int(now * 1000) % 1000:03d}"
+    return os.path.join(DIAGNOSTICS["dir"], f"{prefix}-{stamp}-{os.getpid()}{suffix}")
+
+def profiled(name):
+    """开启--profile时对被装饰的函数做cProfile，保存.prof文件和按累计耗时排序的文本摘要"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not DIAGNOSTICS["profile"]:
+                return func(*args, **kwargs)
+            import cProfile
+            import pstats
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # 其他线程正在做cProfile(同一时间只允许一个)，本次不采样
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                try:
+                    path = diagnostics_file(f"profile-{name}", ".prof")
+                    profiler.dump_stats(path)
+                    with open(os.path.splitext(path)[0] + ".txt", 'w', encoding='utf-8') as f:
+                        pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+                except OSError as e:
+                    print(f"保存性能分析结果出错: {e}")
+        return wrapper
+    return decorator
+
+def start_tracemalloc():
+    if DIAGNOSTICS["tracemalloc"]:
+        import tracemalloc
+        tracemalloc.start(25)
+
+def take_memory_snapshot(point):
+    """在配置的时间点保存tracemalloc快照和占用最多的分配位置"""
+    if point not in DIAGNOSTICS["tracemalloc"]:
+        return
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        return
+    try:
+        snapshot = tracemalloc.take_snapshot()
+        path = diagnostics_file(f"tracemalloc-{point}", ".snap")
+        snapshot.dump(path)
+        current, peak = tracemalloc.get_traced_memory()
+        with open(os.path.splitext(path)[0] + ".txt", 'w', encoding='utf-8') as f:
+            f.write(f"current={current} peak={peak}\n\n")
+            for stat in snapshot.statistics("lineno")[:30]:
+                f.write(f"{stat}\n")
+    except OSError as e:
+        print(f"保存内存快照出错: {e}")
+
+class StallDetector(QObject):
+    """界面线程卡顿检测: 主线程定时器刷新心跳，监视线程发现心跳超时就记录主线程调用栈"""
+    
+    def __init__(self, threshold_ms, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000.0
+        self.main_ident = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stalled_since = None  # 已记录的卡顿开始时间
+        self.log_file = diagnostics_file("stalls", ".log")
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        
+        # 心跳必须按固定的短间隔运行，不交给IdleScheduler(合并和退避会被误判为卡顿)；只在开启诊断时存在
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(max(20, threshold_ms // 4))
+        self.heartbeat.timeout.connect(self.beat)
+        self.heartbeat.start()
+        
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+    
+    def beat(self):
+        now = time.monotonic()
+        with self.lock:
+            self.last_beat = now
+            stalled_since = self.stalled_since
+            self.stalled_since = None
+        if stalled_since is not None:
+            self.write(f"卡顿结束，持续 {(now - stalled_since) * 1000:.0f} ms\n\n")
+    
+    def watch(self):
+        interval = self.heartbeat.interval() / 1000.0
+        while not self.stop_event.wait(interval):
+            with self.lock:
+                blocked = time.monotonic() - self.last_beat
+                if self.stalled_since is not None or blocked < self.threshold:
+                    continue
+                self.stalled_since = self.last_beat
+            frame = sys._current_frames().get(self.main_ident)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(无法获取调用栈)\n"
+            self.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] 界面线程已阻塞 {blocked * 1000:.0f} ms:\n{stack}")
+    
+    def write(self, text):
+        try:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(text)
+        except OSError as e:
+            print(f"写入卡顿日志出错: {e}")
+    
+    def stop(self):
+        self.heartbeat.stop()
+        self.stop_event.set()
+
 # Darcula主题调色板
 class DarculaPalette:
     BACKGROUND = QColor(43, 43, 43)
@@ -114,20 +1691,43 @@ class TitleBarButton(QPushButton):
             }
         """)
 
+def _entry_attribute(name):
+    """把程序行上的属性读写转发到其ProgramEntry"""
+    return property(lambda self: getattr(self.entry, name),
+                    lambda self, value: setattr(self.entry, name, value))
+
 # 程序管理行
 class ProgramRow(QWidget):
-    def __init__(self, manager=None, parent=None):
+    # 配置和运行状态保存在self.entry中，界面控件只负责显示和编辑
+    is_uwp = _entry_attribute("is_uwp")
+    process_name = _entry_attribute("process_name")
+    selected_process = _entry_attribute("selected_process")
+    priority = _entry_attribute("priority")
+    cpu_affinity = _entry_attribute("cpu_affinity")
+    io_priority = _entry_attribute("io_priority")
+    if_running = _entry_attribute("if_running")
+    launch_priority = _entry_attribute("launch_priority")
+    depends_on = _entry_attribute("depends_on")
+    running = _entry_attribute("running")
+    pending = _entry_attribute("pending")
+    launched_pids = _entry_attribute("launched_pids")
+    tuned_pids = _entry_attribute("tuned_pids")
+    
+    def __init__(self, manager=None, entry=None, parent=None):
         super().__init__(parent)
         self.manager = manager
-        self.process_name = None
-        self.is_uwp = False
-        self.selected_process = None
-        self.running = False
+        self.entry = entry or ProgramEntry()
         
         layout = QHBoxLayout()
         layout.setContentsMargins(5, 5, 5, 5)
         layout.setSpacing(5)
         
+        # 程序图标
+        self.icon_label = QLabel()
+        self.icon_label.setFixedSize(24, 25)
+        self.icon_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.icon_label)
+        
         # 程序路径输入框
         self.path_input = QLineEdit()
         self.path_input.setPlaceholderText("拖放程序或快捷方式，或点击浏览按钮")
@@ -146,7 +1746,10 @@ class ProgramRow(QWidget):
                 border: 1px solid #3C6496;
             }
         """)
+        self.path_input.setText(self.entry.path)
         self.path_input.setAcceptDrops(True)
+        self.path_input.textChanged.connect(self.on_path_changed)
+        self.path_input.editingFinished.connect(self.refresh_icon)
         layout.addWidget(self.path_input, 4)
         
         # 浏览按钮
@@ -245,6 +1848,7 @@ class ProgramRow(QWidget):
         if files:
             self.path_input.setText(files[0])
             self.check_if_uwp(files[0])
+            self.refresh_icon()
     
     def browse_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -256,26 +1860,51 @@ class ProgramRow(QWidget):
         if file_path:
             self.path_input.setText(file_path)
             self.check_if_uwp(file_path)
+            self.refresh_icon()
+    
+    def on_path_changed(self, text):
+        self.entry.path = text
+        if self.manager:
+            self.manager.invalidate_launch_plan()
+    
+    def refresh_icon(self):
+        """在后台加载当前路径对应的程序图标"""
+        self.icon_label.clear()
+        path = self.get_program_path()
+        if path:
+            get_icon_provider().request(path, lambda icon, p=path: self.set_icon(p, icon))
+    
+    def set_icon(self, path, icon):
+        # 路径在图标加载期间被修改时丢弃旧结果
+        if path == self.get_program_path():
+            self.icon_label.setPixmap(icon.pixmap(20, 20))
     
     def check_if_uwp(self, file_path):
         """检查是否为UWP应用快捷方式"""
-        self.is_uwp = False
-        if file_path.lower().endswith('.lnk') and Dispatch:
-            try:
-                shell = Dispatch("WScript.Shell")
-                shortcut = shell.CreateShortCut(file_path)
-                target_path = shortcut.TargetPath
-                # UWP应用通常有AppX标记或没有.exe扩展名
-                if "AppX" in target_path or not target_path.lower().endswith('.exe'):
-                    self.is_uwp = True
-                    # 从快捷方式文件名提取UWP应用名称
-                    app_name = os.path.splitext(os.path.basename(file_path))[0]
-                    self.process_name = app_name
-            except:
-                pass
+        self.is_uwp, app_name, _ = inspect_program_path(file_path)
+        if self.is_uwp:
+            self.process_name = app_name
+    
+    def set_pending(self, text):
+        """显示延后启动队列中的等待状态"""
+        self.pending = True
+        self.entry.status_text = text
+        self.status_label.setText(text)
+        self.status_label.setStyleSheet("""
+            QLabel {
+                background-color: #373737;
+                border: 1px solid #4B4B4B;
+                color: #C0A050;
+                border-radius: 3px;
+                padding: 3px 5px;
+                font-size: 10pt;
+            }
+        """)
     
     def set_status(self, running, process_name=None):
         self.running = running
+        self.pending = False
+        self.entry.status_text = process_name if running else None
         if running:
             self.status_label.setText(process_name or "运行中")
             self.status_label.setStyleSheet("""
@@ -301,6 +1930,13 @@ class ProgramRow(QWidget):
                 }
             """)
     
+    def restore_status(self):
+        """按程序的运行状态恢复显示，用于重建界面"""
+        if self.entry.pending:
+            self.set_pending(self.entry.status_text or "延后启动")
+        elif self.entry.running:
+            self.set_status(True, self.entry.status_text)
+    
     def select_process(self):
         if not self.manager:
             return
@@ -316,11 +1952,16 @@ class ProgramRow(QWidget):
             self.manager.remove_program_row(self)
     
     def get_program_path(self):
-        return self.path_input.text().strip()
+        return self.entry.get_program_path()
     
     def is_valid(self):
-        path = self.get_program_path()
-        return bool(path) and os.path.exists(path)
+        return self.entry.is_valid()
+    
+    def has_tuning(self):
+        return self.entry.has_tuning()
+    
+    def apply_tuning(self, proc):
+        self.entry.apply_tuning(proc)
 
 # 进程选择对话框
 class ProcessSelectorDialog(QDialog):
@@ -367,6 +2008,9 @@ class ProcessSelectorDialog(QDialog):
         layout.addLayout(button_layout)
         self.setLayout(layout)
         
+        # 对话框关闭后不再接收图标
+        self.finished.connect(lambda: get_icon_provider().cancel(self))
+        
         # 加载进程
         self.load_processes()
         
@@ -415,10 +2059,11 @@ class ProcessSelectorDialog(QDialog):
             }
         """)
     
+    @profiled("load_processes")
     def load_processes(self):
         self.all_processes = []
         if psutil:
-            for proc in psutil.process_iter(['pid', 'name', 'exe']):
+            for proc in process_iter(['pid', 'name', 'exe']):
                 try:
                     info = proc.info
                     if info['exe']:
@@ -430,12 +2075,25 @@ class ProcessSelectorDialog(QDialog):
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                     pass
         
+        icons = get_icon_provider()
+        icons.cancel(self)
+        self.icon_rows = {}  # exe路径 -> 使用该图标的行号
         self.process_table.setRowCount(len(self.all_processes))
         for row, proc_info in enumerate(self.all_processes):
             for col, item in enumerate(proc_info):
                 table_item = QTableWidgetItem(item)
                 table_item.setFlags(table_item.flags() & ~Qt.ItemIsEditable)
                 self.process_table.setItem(row, col, table_item)
+            self.icon_rows.setdefault(proc_info[2], []).append(row)
+        # 同一程序的多个进程只请求一次图标
+        for path in self.icon_rows:
+            icons.request(path, lambda icon, p=path: self.set_process_icon(p, icon), receiver=self)
+    
+    def set_process_icon(self, path, icon):
+        for row in self.icon_rows.get(path, []):
+            item = self.process_table.item(row, 0)
+            if item:
+                item.setIcon(icon)
     
     def filter_processes(self, text):
         text = text.lower()
@@ -528,129 +2186,1164 @@ class CustomTitleBar(QWidget):
             self.parent.move(event.globalPos() - self.drag_position)
             event.accept()
 
+# 可取消的后台任务
+class JobThread(QThread):
+    """启动/关闭任务的基类: 取消通过事件通知，任务在等待中也能立即响应；按已完成数估算剩余时间"""
+    progress = pyqtSignal(int, int, str, float)  # 已完成数, 总数, 当前项目, 预计剩余秒数(未知时为-1)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cancel_event = threading.Event()
+        self.job_started = None
+    
+    @property
+    def is_running(self):
+        return not self.cancel_event.is_set()
+    
+    def sleep(self, seconds):
+        """可被stop打断的等待，被取消时返回False"""
+        return not self.cancel_event.wait(seconds)
+    
+    def report_progress(self, done, total, current=""):
+        now = time.time()
+        if self.job_started is None:
+            self.job_started = now
+        eta = (now - self.job_started) / done * (total - done) if done else -1.0
+        self.progress.emit(done, total, current, eta)
+    
+    def stop(self):
+        self.cancel_event.set()
+
 # 启动工作线程
-class LaunchThread(QThread):
+class LaunchThread(JobThread):
     finished = pyqtSignal()
     status_update = pyqtSignal(str, bool, str)  # path, running, process_name
+    process_started = pyqtSignal(str, int)  # path, pid
+    
+    # 等待新进程出现的最长时间(秒)
+    PROCESS_DETECT_TIMEOUT = 5.0
     
-    def __init__(self, programs, parent=None):
+    def __init__(self, programs, history=None, concurrency=0, parent=None):
         super().__init__(parent)
         self.programs = programs
-        self.is_running = True
+        self.history = history
+        self.concurrency = concurrency
+        # 已跟踪PID的副本，在创建线程时(GUI线程)取得，避免工作线程遍历正被修改的集合
+        self.known_pids = {entry.get_program_path(): set(entry.launched_pids) for entry in programs}
     
+    @profiled("launch")
     def run(self):
-        # 先启动普通exe程序
-        for row in self.programs:
-            if not self.is_running:
-                break
-            path = row.get_program_path()
-            if row.is_valid() and not row.is_uwp:
+        # 解析快捷方式目标需要COM
+        if pythoncom:
+            pythoncom.CoInitialize()
+        # 启动前取一次进程快照，已在运行的程序立即标记为运行中，不再进入启动循环
+        snapshot = snapshot_processes()
+        self.already_running = {entry.get_program_path() for entry in self.programs
+                                if (entry.spawn is not None or entry.is_valid())
+                                and self.handle_already_running(entry, snapshot)}
+        # 进程识别在后台进行，不阻塞后续程序的启动
+        self.detector = ThreadPoolExecutor(max_workers=max(4, self.concurrency, os.cpu_count() or 4))
+        # 限制同时处于启动中的程序数，识别到进程(或超时)后释放名额
+        self.slots = threading.Semaphore(self.concurrency) if self.concurrency > 0 else None
+        # 自动放行: 系统还能容纳一个全速启动的程序(CPU占用不超过 1 - 1/核心数)时才启动下一个
+        self.in_flight = 0
+        self.slot_lock = threading.Lock()
+        self.load_limit = 100.0 * (1 - 1 / (os.cpu_count() or 4))
+        if self.concurrency < 0 and psutil:
+            psutil.cpu_percent(None)
+        try:
+            self.launch_programs()
+        finally:
+            self.detector.shutdown(wait=True)
+        
+        self.finished.emit()
+    
+    def launch_programs(self):
+        total = len(self.programs)
+        done = 0
+        # 按依赖层级分批启动，下一层级等本层级的进程识别完成后再开始
+        for level in launch_levels(self.programs):
+            tracking = []
+            # 同一层级内先启动普通exe程序，再启动UWP程序
+            for entry in [e for e in level if not e.is_uwp] + [e for e in level if e.is_uwp]:
+                if not self.is_running:
+                    return
+                if entry.get_program_path() in self.already_running:
+                    done += 1
+                    continue
+                self.report_progress(done, total, os.path.basename(entry.get_program_path()))
+                future = self.launch_entry(entry)
+                if future:
+                    tracking.append(future)
+                done += 1
+            for future in tracking:
+                future.result()
+        self.report_progress(total, total)
+    
+    def launch_entry(self, entry):
+        """启动单个程序，返回进程识别任务；无需启动时返回None"""
+        path = entry.get_program_path()
+        # 已编译的启动计划在加载时校验过文件，不再重复检查
+        if entry.spawn is None and not entry.is_valid():
+            return None
+        if not self.acquire_slot():
+            return None
+        spawn = entry.spawn or ("startfile" if entry.is_uwp else "runas")
+        try:
+            if entry.is_uwp:
+                self.status_update.emit(path, True, entry.process_name or "UWP应用")
+            else:
+                self.status_update.emit(path, True, os.path.basename(path))
+            started = time.time()
+            if spawn == "startfile":
+                # 启动UWP应用
+                os.startfile(path)
+            else:
+                # 以管理员权限启动程序，放入独立的进程组/作业对象，关闭时整体结束
+                group = ProcessGroup.launch(path, entry.target, entry.arguments, entry.working_dir)
+                entry.prune_groups()
+                if group:
+                    entry.groups.append(group)
+            # 稍等让程序启动
+            self.sleep(0.5)
+            return self.detector.submit(self.track_process, entry, path, started)
+        except Exception as e:
+            self.release_slot()
+            print(f"启动程序出错: {e}")
+            return None
+    
+    def handle_already_running(self, entry, snapshot):
+        """程序已在运行时按该行策略处理，返回True表示无需再启动"""
+        if entry.if_running == "new" or not snapshot:
+            return False
+        path = entry.get_program_path()
+        if entry.is_uwp:
+            pids = match_snapshot(snapshot, None, entry.selected_process or entry.process_name, self.known_pids.get(path, ()))
+        else:
+            pids = match_snapshot(snapshot, entry.target or resolve_program_target(path), None, self.known_pids.get(path, ()))
+        if not pids:
+            return False
+        self.status_update.emit(path, True, snapshot[pids[0]][0] or entry.process_name or os.path.basename(path))
+        for pid in pids:
+            self.process_started.emit(path, pid)
+        if entry.if_running == "focus":
+            focus_process_window(pids)
+        return True
+    
+    def acquire_slot(self):
+        """等待启动名额，线程被停止时返回False"""
+        if self.concurrency < 0 and psutil:
+            while self.is_running:
+                with self.slot_lock:
+                    if self.in_flight == 0 or psutil.cpu_percent(None) <= self.load_limit:
+                        self.in_flight += 1
+                        return True
+                self.sleep(0.2)
+            return False
+        if not self.slots:
+            return True
+        while self.is_running:
+            if self.slots.acquire(timeout=0.2):
+                return True
+        return False
+    
+    def release_slot(self):
+        if self.concurrency < 0 and psutil:
+            with self.slot_lock:
+                self.in_flight -= 1
+        if self.slots:
+            self.slots.release()
+    
+    def track_process(self, entry, path, started):
+        try:
+            self.detect_process(entry, path, started)
+        finally:
+            self.release_slot()
+    
+    def detect_process(self, entry, path, started):
+        """识别刚启动的进程，应用该行的调度设置，等程序就绪后记录启动耗时"""
+        if not psutil:
+            return
+        if pythoncom:
+            pythoncom.CoInitialize()
+        target = None if entry.is_uwp else (entry.target or resolve_program_target(path))
+        name = (entry.selected_process or entry.process_name) if entry.is_uwp else None
+        deadline = started + (entry.ready_timeout or self.PROCESS_DETECT_TIMEOUT)
+        # create_time精度有限，留出1秒余量
+        procs = []
+        while self.is_running and not procs and time.time() < deadline:
+            procs = find_program_processes(target, name, since=started - 1)
+            if not procs:
+                self.sleep(0.2)
+        for proc in procs:
+            if entry.has_tuning():
+                entry.apply_tuning(proc)
+            self.process_started.emit(path, proc.pid)
+        ready_seconds = None
+        if procs:
+            ready_at = self.wait_until_ready([proc.pid for proc in procs], deadline)
+            if ready_at is not None:
+                ready_seconds = ready_at - started
+                entry.launch_count += 1
+                entry.last_launch_seconds = ready_seconds
+        if self.history and self.is_running:
+            try:
+                self.history.record_launch(path, started, ready_seconds, procs[0].pid if procs else None)
+            except sqlite3.Error as e:
+                print(f"记录启动历史出错: {e}")
+
+    # 进程一直没有消息队列超过该时间(秒)则视为控制台/后台程序，以识别出进程的时间为就绪时间
+    NO_GUI_GRACE = 2.0
+    
+    def wait_until_ready(self, pids, deadline):
+        """等程序出现可见顶层窗口或完成初始化等待输入，返回就绪时刻；超时返回None
+        
+        非Windows平台无法判断窗口就绪，以识别出进程的时间为准"""
+        detected = time.time()
+        if not hasattr(ctypes, "windll"):
+            return detected
+        while self.is_running:
+            now = time.time()
+            if find_process_window(pids):
+                return now
+            states = [input_idle_state(pid) for pid in pids]
+            if "idle" in states:
+                return now
+            if "busy" not in states and now - detected >= self.NO_GUI_GRACE:
+                return detected
+            if now >= deadline:
+                return None
+            self.sleep(0.2)
+        return None
+
+# 延后启动线程：等关键程序启动完成且系统空闲后再启动低优先级程序
+class DeferredLaunchThread(LaunchThread):
+    waiting_update = pyqtSignal(str)  # 当前等待状态描述
+    
+    def __init__(self, programs, settings, history=None, parent=None):
+        super().__init__(programs, history, parent=parent)
+        self.settings = settings
+    
+    def run(self):
+        if self.wait_for_idle():
+            super().run()
+        else:
+            self.finished.emit()
+    
+    def wait_for_idle(self):
+        """等待CPU和磁盘持续低于阈值，超过最长等待时间也会返回True；被停止时返回False"""
+        if not psutil:
+            return self.is_running
+        idle_seconds = self.settings["deferred_idle_seconds"]
+        max_delay = self.settings["deferred_max_delay"]
+        cpu_threshold = self.settings["deferred_cpu_threshold"]
+        disk_threshold = self.settings["deferred_disk_threshold"] * 1024 * 1024
+        
+        start = time.time()
+        idle_since = None
+        last_io = psutil.disk_io_counters()
+        last_time = start
+        psutil.cpu_percent(None)
+        while self.sleep(0.5):
+            cpu = psutil.cpu_percent(None)
+            now = time.time()
+            io = psutil.disk_io_counters()
+            disk_rate = 0
+            if io and last_io:
+                moved = (io.read_bytes + io.write_bytes) - (last_io.read_bytes + last_io.write_bytes)
+                disk_rate = moved / max(now - last_time, 0.001)
+            last_io, last_time = io, now
+            
+            if cpu < cpu_threshold and disk_rate < disk_threshold:
+                idle_since = idle_since or now
+            else:
+                idle_since = None
+            if idle_since and now - idle_since >= idle_seconds:
+                return True
+            if now - start >= max_delay:
+                return True
+            
+            remaining = int(max_delay - (now - start))
+            if idle_since:
+                self.waiting_update.emit(f"等待空闲 ({int(now - idle_since)}/{idle_seconds}秒)")
+            else:
+                self.waiting_update.emit(f"等待空闲 (最多{remaining}秒)")
+        return False
+
+# 进程退出监视
+class ProcessExitWatcher(QObject):
+    """在单个后台线程中等待进程退出通知，无变化时不产生任何唤醒
+
+    Linux使用pidfd + epoll，Windows使用进程句柄 + WaitForMultipleObjects，超出其上限的进程交给
+    系统线程池等待(RegisterWaitForSingleObject)；无法获取句柄的进程(或平台不支持时)退回到定时轮询。
+    """
+    process_exited = pyqtSignal(int, object)  # pid, 退出码(未知时为None)
+    
+    POLL_INTERVAL = 2.0
+    # WaitForMultipleObjects最多等待64个对象，其中一个留给唤醒事件，其余进程由线程池等待
+    WIN32_MAX_HANDLES = 63
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cond = threading.Condition()
+        self.added = set()
+        self.removed = set()
+        self.polled = set()       # 退回轮询的PID
+        self.exited = {}          # 最近退出的PID -> 退出码
+        self.stopping = False
+        self.wakeups = 0          # 监视线程被唤醒的次数
+        if sys.platform.startswith("linux") and hasattr(os, "pidfd_open") and hasattr(select, "epoll"):
+            self.backend = "pidfd"
+            self.wake_r, self.wake_w = os.pipe()
+        elif sys.platform == "win32":
+            self.backend = "win32"
+            self.kernel32 = ctypes.windll.kernel32
+            self.kernel32.CreateEventW.restype = ctypes.c_void_p
+            self.kernel32.OpenProcess.restype = ctypes.c_void_p
+            self.kernel32.SetEvent.argtypes = [ctypes.c_void_p]
+            self.kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+            self.kernel32.GetExitCodeProcess.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_ulong)]
+            self.kernel32.WaitForMultipleObjects.argtypes = [
+                ctypes.c_ulong, ctypes.POINTER(ctypes.c_void_p), ctypes.c_int, ctypes.c_ulong
+            ]
+            self.kernel32.WaitForMultipleObjects.restype = ctypes.c_ulong  # DWORD
+            self.kernel32.WaitForSingleObject.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+            self.kernel32.WaitForSingleObject.restype = ctypes.c_ulong
+            self.kernel32.RegisterWaitForSingleObject.argtypes = [
+                ctypes.POINTER(ctypes.c_void_p), ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+                ctypes.c_ulong, ctypes.c_ulong
+            ]
+            self.kernel32.UnregisterWaitEx.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+            self.signalled = []  # 线程池等待报告已退出的PID
+            self.wait_callback = ctypes.WINFUNCTYPE(None, ctypes.c_void_p, ctypes.c_bool)(self.on_wait_signalled)
+            self.wake_event = self.kernel32.CreateEventW(None, False, False, None)
+        else:
+            self.backend = "poll"
+        self.thread = threading.Thread(target=self.run, name="ProcessExitWatcher", daemon=True)
+        self.thread.start()
+    
+    def watch(self, pid):
+        """开始监视进程，进程已退出时也会立即发出通知"""
+        with self.cond:
+            self.exited.pop(pid, None)
+            self.removed.discard(pid)
+            self.added.add(pid)
+        self.wake()
+    
+    def unwatch(self, pid):
+        with self.cond:
+            self.added.discard(pid)
+            self.removed.add(pid)
+        self.wake()
+    
+    def wait_for_exit(self, pids, timeout, cancel=None):
+        """阻塞等待一组进程退出，返回 {pid: 退出码}，只包含已退出的进程
+        
+        cancel为threading.Event，被设置后调用interrupt()即可提前返回"""
+        pids = set(pids)
+        for pid in pids:
+            self.watch(pid)
+        with self.cond:
+            self.cond.wait_for(lambda: pids <= self.exited.keys() or self.stopping
+                               or (cancel is not None and cancel.is_set()), timeout)
+            return {pid: self.exited[pid] for pid in pids if pid in self.exited}
+    
+    def interrupt(self):
+        """唤醒所有wait_for_exit，让其重新检查取消标记"""
+        with self.cond:
+            self.cond.notify_all()
+    
+    def stop(self, wait=True):
+        """停止监视线程；wait为False时只发出停止请求，用stopped()查询是否已结束"""
+        self.stopping = True
+        self.wake()
+        if wait:
+            self.thread.join(1.0)
+    
+    def stopped(self):
+        return not self.thread.is_alive()
+    
+    def wake(self):
+        if self.backend == "pidfd":
+            os.write(self.wake_w, b"\0")
+        elif self.backend == "win32":
+            self.kernel32.SetEvent(self.wake_event)
+        else:
+            with self.cond:
+                self.cond.notify_all()
+    
+    def take_changes(self):
+        with self.cond:
+            added, removed = self.added, self.removed
+            self.added, self.removed = set(), set()
+            self.polled -= removed
+        return added, removed
+    
+    def notify_exit(self, pid, exit_code=None):
+        with self.cond:
+            self.polled.discard(pid)
+            self.exited[pid] = exit_code
+            # 只保留最近的退出记录
+            while len(self.exited) > 1024:
+                del self.exited[next(iter(self.exited))]
+            self.cond.notify_all()
+        self.process_exited.emit(pid, exit_code)
+    
+    def check_polled(self):
+        for pid in list(self.polled):
+            if not psutil or not psutil.pid_exists(pid):
+                self.notify_exit(pid)
+    
+    def poll_timeout(self):
+        return self.POLL_INTERVAL if self.polled else None
+    
+    def run(self):
+        if self.backend == "pidfd":
+            self.run_pidfd()
+        elif self.backend == "win32":
+            self.run_win32()
+        else:
+            self.run_poll()
+    
+    def run_pidfd(self):
+        epoll = select.epoll()
+        epoll.register(self.wake_r, select.EPOLLIN)
+        fds = {}  # fd -> pid
+        while not self.stopping:
+            added, removed = self.take_changes()
+            for fd, pid in list(fds.items()):
+                if pid in removed:
+                    epoll.unregister(fd)
+                    os.close(fd)
+                    del fds[fd]
+            for pid in added:
                 try:
-                    process_name = os.path.basename(path)
-                    self.status_update.emit(path, True, process_name)
-                    # 以管理员权限启动程序
-                    ctypes.windll.shell32.ShellExecuteW(
-                        None, "runas", path, None, None, 1
-                    )
-                    # 稍等让程序启动
-                    time.sleep(0.5)
-                except Exception as e:
-                    print(f"启动程序出错: {e}")
-        
-        # 再启动UWP程序
-        for row in self.programs:
+                    fd = os.pidfd_open(pid)
+                except ProcessLookupError:
+                    self.notify_exit(pid)
+                    continue
+                except OSError:
+                    with self.cond:
+                        self.polled.add(pid)
+                    continue
+                fds[fd] = pid
+                epoll.register(fd, select.EPOLLIN)
+            
+            timeout = self.poll_timeout()
+            events = epoll.poll(-1 if timeout is None else timeout)
+            self.wakeups += 1
+            for fd, _ in events:
+                if fd == self.wake_r:
+                    os.read(self.wake_r, 4096)
+                    continue
+                pid = fds.pop(fd)
+                epoll.unregister(fd)
+                os.close(fd)
+                self.notify_exit(pid)
+            self.check_polled()
+        for fd in fds:
+            os.close(fd)
+        epoll.close()
+    
+    def on_wait_signalled(self, context, timed_out):
+        """线程池等待的回调，只记录PID并唤醒监视线程"""
+        with self.cond:
+            self.signalled.append(context)
+        self.kernel32.SetEvent(self.wake_event)
+    
+    def exit_code(self, handle):
+        code = ctypes.c_ulong()
+        return code.value if self.kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) else None
+    
+    def run_win32(self):
+        kernel32 = self.kernel32
+        handles = {}     # pid -> 进程句柄
+        registered = {}  # pid -> (进程句柄, 等待句柄)，超出WaitForMultipleObjects上限的进程
+        while not self.stopping:
+            added, removed = self.take_changes()
+            for pid in removed:
+                if pid in handles:
+                    kernel32.CloseHandle(handles.pop(pid))
+                if pid in registered:
+                    handle, wait = registered.pop(pid)
+                    # INVALID_HANDLE_VALUE: 等回调执行完再返回
+                    kernel32.UnregisterWaitEx(wait, ctypes.c_void_p(-1))
+                    kernel32.CloseHandle(handle)
+            for pid in added:
+                # SYNCHRONIZE | PROCESS_QUERY_LIMITED_INFORMATION
+                handle = kernel32.OpenProcess(0x00100000 | 0x1000, False, pid)
+                if handle and len(handles) < self.WIN32_MAX_HANDLES:
+                    handles[pid] = handle
+                elif handle:
+                    wait = ctypes.c_void_p()
+                    # WT_EXECUTEINWAITTHREAD | WT_EXECUTEONLYONCE
+                    if kernel32.RegisterWaitForSingleObject(ctypes.byref(wait), handle, self.wait_callback,
+                                                            pid, 0xFFFFFFFF, 0x4 | 0x8):
+                        registered[pid] = (handle, wait.value)
+                    else:
+                        kernel32.CloseHandle(handle)
+                        with self.cond:
+                            self.polled.add(pid)
+                elif psutil and psutil.pid_exists(pid):
+                    with self.cond:
+                        self.polled.add(pid)
+                else:
+                    self.notify_exit(pid)
+            
+            items = list(handles.items())
+            array = (ctypes.c_void_p * (len(items) + 1))(self.wake_event, *[h for _, h in items])
+            timeout = self.poll_timeout()
+            result = kernel32.WaitForMultipleObjects(
+                len(array), array, False, 0xFFFFFFFF if timeout is None else int(timeout * 1000)
+            )
+            self.wakeups += 1
+            if 1 <= result <= len(items):
+                pid, handle = items[result - 1]
+                exit_code = self.exit_code(handle)
+                kernel32.CloseHandle(handles.pop(pid))
+                self.notify_exit(pid, exit_code)
+            elif 0x81 <= result <= 0x80 + len(items):
+                # WAIT_ABANDONED_0 + n: 进程句柄不应出现，当作无效句柄改为轮询
+                self.drop_handle(handles, items[result - 0x81][0])
+            elif result == 0xFFFFFFFF:
+                # WAIT_FAILED: 逐个检查找出无效句柄改为轮询，避免反复立即返回空转
+                for pid, handle in items:
+                    if kernel32.WaitForSingleObject(handle, 0) == 0xFFFFFFFF:
+                        self.drop_handle(handles, pid)
+            with self.cond:
+                signalled, self.signalled = self.signalled, []
+            for pid in signalled:
+                if pid not in registered:
+                    continue
+                handle, wait = registered.pop(pid)
+                # 回调已执行完(只执行一次)，注销时不需要等待
+                kernel32.UnregisterWaitEx(wait, None)
+                exit_code = self.exit_code(handle)
+                kernel32.CloseHandle(handle)
+                self.notify_exit(pid, exit_code)
+            self.check_polled()
+        for handle in handles.values():
+            kernel32.CloseHandle(handle)
+        for handle, wait in registered.values():
+            kernel32.UnregisterWaitEx(wait, ctypes.c_void_p(-1))
+            kernel32.CloseHandle(handle)
+    
+    def drop_handle(self, handles, pid):
+        """关闭无法等待的进程句柄，改为定时轮询该进程"""
+        self.kernel32.CloseHandle(handles.pop(pid))
+        with self.cond:
+            self.polled.add(pid)
+    
+    def run_poll(self):
+        while not self.stopping:
+            added, _ = self.take_changes()
+            with self.cond:
+                self.polled |= added
+                if not self.added and not self.removed and not self.stopping:
+                    self.cond.wait(self.poll_timeout())
+            self.wakeups += 1
+            self.check_polled()
+
+def run_exit_watch_selftest(idle_seconds=2.0, max_idle_wakeups=0):
+    """启动一个休眠的子进程，检查监视器在进程运行期间不被唤醒、进程退出后及时收到通知，返回退出码"""
+    if sys.platform == "win32":
+        command = [sys.executable, "-c", f"import time; time.sleep({idle_seconds + 1})"]
+    else:
+        command = ["sleep", str(idle_seconds + 1)]
+    watcher = ProcessExitWatcher()
+    child = subprocess.Popen(command)
+    try:
+        watcher.watch(child.pid)
+        # 等监视线程处理完watch带来的那次唤醒
+        time.sleep(0.2)
+        before = watcher.wakeups
+        time.sleep(idle_seconds)
+        idle_wakeups = watcher.wakeups - before
+        started = time.perf_counter()
+        exited = watcher.wait_for_exit([child.pid], timeout=5 + idle_seconds)
+        latency = (time.perf_counter() - started) * 1000
+    finally:
+        child.kill()
+        child.wait()
+        watcher.stop()
+    ok = idle_wakeups <= max_idle_wakeups and child.pid in exited
+    print(f"后端: {watcher.backend}")
+    print(f"空闲 {idle_seconds:g} 秒内唤醒: {idle_wakeups} 次 (上限 {max_idle_wakeups})")
+    print(f"退出通知: {'%.0f 毫秒' % latency if child.pid in exited else '未收到'}")
+    print("通过" if ok else "失败")
+    return 0 if ok else 1
+
+# 进程重新查找线程: 跟踪的进程全部退出后，在后台查找同一程序的其他进程(如启动器拉起的主程序)
+class ProcessRescanThread(JobThread):
+    found = pyqtSignal(str, list)  # path, 找到的PID列表
+    
+    def __init__(self, path, target, process_name, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.target = target
+        self.process_name = process_name
+    
+    def run(self):
+        if pythoncom:
+            pythoncom.CoInitialize()
+        pids = []
+        try:
+            target = self.target
+            if target is None and not self.process_name:
+                target = resolve_program_target(self.path)
+            pids = [proc.pid for proc in find_program_processes(target, self.process_name)]
+        except Exception as e:
+            print(f"查找程序进程出错: {e}")
+        if self.is_running:
+            self.found.emit(self.path, pids)
+
+# 调度设置补充线程: 对已启动进程后来派生的子进程应用调度设置，每次只遍历一次进程表
+class TuningThread(JobThread):
+    def __init__(self, work, parent=None):
+        super().__init__(parent)
+        self.work = work  # [(entry, 已启动进程PID集合)]，在界面线程中复制
+    
+    def run(self):
+        children = process_children_map()
+        for entry, pids in self.work:
+            stack = list(pids)
+            seen = set(stack)
+            while stack and self.is_running:
+                for child in children.get(stack.pop(), []):
+                    if child.pid in seen:
+                        continue
+                    seen.add(child.pid)
+                    stack.append(child.pid)
+                    try:
+                        entry.apply_tuning(child)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        continue
+
+# 关闭工作线程
+class CloseThread(JobThread):
+    finished = pyqtSignal()
+    status_update = pyqtSignal(str, bool)  # path, running
+    
+    def __init__(self, programs, watcher, history=None, parent=None):
+        super().__init__(parent)
+        self.programs = programs
+        self.history = history
+        # 共享的进程退出监视器，由创建方负责停止
+        self.watcher = watcher
+    
+    @profiled("close")
+    def run(self):
+        # 关闭所有程序
+        total = len(self.programs)
+        for done, entry in enumerate(self.programs):
             if not self.is_running:
                 break
-            path = row.get_program_path()
-            if row.is_valid() and row.is_uwp:
+            self.report_progress(done, total, os.path.basename(entry.get_program_path()))
+            if not entry.is_valid():
+                continue
+            
+            started = time.time()
+            closed = False
+            exit_code = None
+            try:
+                # 获取进程名称
+                process_name = entry.selected_process or entry.process_name or os.path.basename(entry.get_program_path())
+                
+                # 由本程序启动的实例整体结束，不需要遍历进程树
+                entry.prune_groups()
+                groups = list(entry.groups)
+                if groups:
+                    exit_code = self.close_groups(entry, groups)
+                    self.status_update.emit(entry.get_program_path(), False)
+                    closed = True
+                # 关闭进程及其子进程
+                elif psutil:
+                    for proc in process_iter(['pid', 'name', 'exe']):
+                        if not self.is_running:
+                            break
+                        try:
+                            info = proc.info
+                            proc_name = info['name'].lower()
+                            # 检查进程名是否匹配
+                            if process_name.lower() in proc_name:
+                                # 结束进程树
+                                parent = get_process(info['pid'])
+                                children = parent.children(recursive=True)
+                                
+                                # 先结束子进程
+                                for child in children:
+                                    try:
+                                        child.terminate()
+                                    except:
+                                        pass
+                                
+                                # 等待子进程结束
+                                self.watcher.wait_for_exit([child.pid for child in children], 3, self.cancel_event)
+                                
+                                # 结束父进程
+                                try:
+                                    parent.terminate()
+                                    codes = self.watcher.wait_for_exit([parent.pid], 3, self.cancel_event)
+                                    if parent.pid not in codes:
+                                        raise psutil.TimeoutExpired(3, parent.pid)
+                                    if exit_code is None:
+                                        exit_code = codes[parent.pid]
+                                except:
+                                    # 任务被取消时不再强制结束
+                                    if self.is_running:
+                                        try:
+                                            parent.kill()
+                                        except:
+                                            pass
+                                
+                                self.status_update.emit(entry.get_program_path(), False)
+                                closed = True
+                        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                            continue
+            except Exception as e:
+                print(f"关闭程序出错: {e}")
+            
+            if closed and self.history:
                 try:
-                    self.status_update.emit(path, True, row.process_name or "UWP应用")
-                    # 启动UWP应用
-                    if os.path.exists(path):
-                        os.startfile(path)
-                    # 稍等让程序启动
-                    time.sleep(0.5)
-                except Exception as e:
-                    print(f"启动UWP应用出错: {e}")
+                    self.history.record_close(entry.get_program_path(), started, time.time() - started, exit_code)
+                except sqlite3.Error as e:
+                    print(f"记录关闭历史出错: {e}")
         
+        self.report_progress(total, total)
         self.finished.emit()
     
+    def close_groups(self, entry, groups):
+        """每个容器发送一次结束信号后统一等待，超时未退出的整体强制结束；返回首个进程的退出码"""
+        pids = []
+        for group in groups:
+            pids.extend(group.wait_pids())
+            group.terminate()
+        deadline = time.time() + 3
+        codes = self.watcher.wait_for_exit(pids, 3, self.cancel_event)
+        # 首个进程退出后其余成员可能仍在退出中
+        while any(group.alive() for group in groups) and time.time() < deadline and self.sleep(0.1):
+            pass
+        if len(codes) < len(pids) or any(group.alive() for group in groups):
+            # 任务被取消时不再强制结束，保留容器以便下次关闭
+            if not self.is_running:
+                return None
+            for group in groups:
+                group.kill()
+        for group in entry.groups:
+            group.release()
+        entry.groups = []
+        return codes.get(groups[0].pid)
+    
     def stop(self):
-        self.is_running = False
+        super().stop()
+        self.watcher.interrupt()
 
-# 关闭工作线程
-class CloseThread(QThread):
-    finished = pyqtSignal()
-    status_update = pyqtSignal(str, bool)  # path, running
+# 批量导入线程
+class ImportThread(QThread):
+    finished_import = pyqtSignal(list)  # [{"path", "is_uwp", "process_name", "target"}]
+    progress = pyqtSignal(int, int)     # 已解析数, 总数
+    
+    IMPORT_EXTENSIONS = ('.exe', '.lnk', '.bat', '.cmd')
     
-    def __init__(self, programs, parent=None):
+    def __init__(self, directory, existing_paths, parent=None):
         super().__init__(parent)
-        self.programs = programs
+        self.directory = directory
+        self.existing_paths = existing_paths
         self.is_running = True
     
-    def run(self):
-        # 关闭所有程序
-        for row in self.programs:
-            if not row.is_valid():
+    def run(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            if not self.is_running:
+                break
+            files.extend(os.path.join(root, name) for name in names
+                         if name.lower().endswith(self.IMPORT_EXTENSIONS))
+        
+        # 快捷方式解析走COM，线程池中每个线程都要初始化
+        initializer = pythoncom.CoInitialize if pythoncom else None
+        results = []
+        pool = ThreadPoolExecutor(max_workers=8, initializer=initializer)
+        try:
+            existing = set(pool.map(self.dedup_key, self.existing_paths))
+            for done, (path, info) in enumerate(zip(files, pool.map(inspect_program_path, files)), 1):
+                if not self.is_running:
+                    break
+                key = os.path.normcase(os.path.abspath(info[2]))
+                if key not in existing:
+                    existing.add(key)
+                    results.append({"path": path, "is_uwp": info[0], "process_name": info[1], "target": info[2]})
+                if done % 20 == 0 or done == len(files):
+                    self.progress.emit(done, len(files))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        
+        self.finished_import.emit(results)
+    
+    @staticmethod
+    def dedup_key(path):
+        return os.path.normcase(os.path.abspath(inspect_program_path(path)[2]))
+    
+    def stop(self):
+        self.is_running = False
+
+# 页缓存预读
+class Prefetcher:
+    """按启动顺序预读各程序的可执行文件和清单中记录的已加载文件
+    
+    清单记录每个程序运行后实际映射的文件(DLL等)，下一次预读时一并读入。
+    支持posix_fadvise的系统只提交预读请求，否则分块读取文件让系统缓存。"""
+    
+    CHUNK_SIZE = 1024 * 1024
+    # 程序启动后等待多久(秒)再记录其加载的文件，让程序完成初始化
+    RECORD_DELAY = 30
+    
+    def __init__(self, manifest_file, budget_bytes):
+        self.manifest_file = manifest_file
+        self.budget = budget_bytes
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.recorded = set()  # 本次运行中已记录过的程序
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+    
+    def start(self, entries):
+        """在后台开始预读，上一轮尚未完成时先停止"""
+        self.stop()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(list(entries), self.stop_event), daemon=True)
+        self.thread.start()
+    
+    def files_for(self, entries):
+        files = []
+        seen = set()
+        for entry in entries:
+            path = entry.get_program_path()
+            target = None if entry.is_uwp else (entry.target or resolve_program_target(path))
+            with self.lock:
+                loaded = list(self.manifest.get(path, []))
+            for file in [target] + loaded:
+                key = os.path.normcase(file) if file else None
+                if key and key not in seen:
+                    seen.add(key)
+                    files.append(file)
+        return files
+    
+    def run(self, entries, stop_event):
+        if pythoncom:
+            pythoncom.CoInitialize()
+        remaining = self.budget
+        for file in self.files_for(entries):
+            if stop_event.is_set() or remaining <= 0:
+                break
+            try:
+                remaining -= self.prefetch_file(file, remaining, stop_event)
+            except OSError:
+                continue
+    
+    def prefetch_file(self, file, limit, stop_event):
+        """预读一个文件的前limit字节，返回计入预算的字节数"""
+        size = min(os.path.getsize(file), limit)
+        with open(file, 'rb', buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, size, os.POSIX_FADV_WILLNEED)
+                return size
+            done = 0
+            while done < size and not stop_event.is_set():
+                chunk = f.read(min(self.CHUNK_SIZE, size - done))
+                if not chunk:
+                    break
+                done += len(chunk)
+            return done
+    
+    def record_later(self, path, pid):
+        """程序运行一段时间后记录它映射的文件，每个程序每次运行只记录一次"""
+        if not psutil or path in self.recorded:
+            return
+        self.recorded.add(path)
+        timer = threading.Timer(self.RECORD_DELAY, self.record, args=(path, pid))
+        timer.daemon = True
+        timer.start()
+    
+    def record(self, path, pid):
+        try:
+            maps = psutil.Process(pid).memory_maps(grouped=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, OSError):
+            self.recorded.discard(path)
+            return
+        files = sorted({m.path for m in maps if m.path and os.path.isfile(m.path)})
+        with self.lock:
+            self.manifest[path] = files
+            manifest = dict(self.manifest)
+        try:
+            with open(self.manifest_file, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存预读清单出错: {e}")
+    
+    def stop(self):
+        self.stop_event.set()
+
+# 状态接口
+def collect_program_metrics(entries, proc_cache):
+    """汇总每个程序已跟踪进程的状态，proc_cache保存psutil.Process对象以便计算CPU占用"""
+    now = time.time()
+    alive = set()
+    programs = []
+    # 所有进程组共用一次进程表遍历
+    scanned = scan_process_groups(group.pid for entry in entries for group in entry.groups
+                                  if isinstance(group, PosixProcessGroup))
+    for entry in entries:
+        path = entry.get_program_path()
+        if not path:
+            continue
+        cpu = 0.0
+        rss = 0
+        started = None
+        pids = []
+        for pid in sorted(entry.launched_pids):
+            proc = proc_cache.get(pid)
+            try:
+                if proc is None:
+                    proc = proc_cache[pid] = psutil.Process(pid)
+                with proc.oneshot():
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    created = proc.create_time()
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            alive.add(pid)
+            pids.append(pid)
+            started = created if started is None else min(started, created)
+        programs.append({
+            "path": path,
+            "name": os.path.splitext(os.path.basename(path))[0],
+            "running": bool(entry.running),
+            "pending": bool(entry.pending),
+            "pids": pids,
+            "uptime_seconds": round(now - started, 1) if started else None,
+            "last_launch_seconds": entry.last_launch_seconds,
+            "launch_count": entry.launch_count,
+            "cpu_percent": round(cpu, 1),
+            "rss_bytes": rss,
+            "group": group_accounting(entry.groups, scanned),
+        })
+    # 丢掉已退出进程的缓存
+    for pid in list(proc_cache):
+        if pid not in alive:
+            del proc_cache[pid]
+    return programs
+
+def group_accounting(groups, scanned=None):
+    """合计程序各归属容器的资源统计，没有容器时返回None"""
+    if not groups:
+        return None
+    total = {"cpu_seconds": 0.0, "processes": None, "active_processes": 0, "peak_memory_bytes": None}
+    for group in groups:
+        for key, value in group.accounting(scanned).items():
+            if value is not None:
+                total[key] = (total[key] or 0) + value
+    total["cpu_seconds"] = round(total["cpu_seconds"], 2)
+    return total
+
+def _prometheus_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# 指标名 -> (类型, 说明, 取值)
+PROMETHEUS_METRICS = [
+    ("launcher_program_running", "gauge", "Whether the program is running", lambda p: int(p["running"])),
+    ("launcher_program_processes", "gauge", "Number of tracked processes", lambda p: len(p["pids"])),
+    ("launcher_program_uptime_seconds", "gauge", "Seconds since the oldest tracked process started", lambda p: p["uptime_seconds"]),
+    ("launcher_program_last_launch_seconds", "gauge", "Duration of the last launch until the program was ready", lambda p: p["last_launch_seconds"]),
+    ("launcher_program_launches_total", "counter", "Launches detected since the launcher started", lambda p: p["launch_count"]),
+    ("launcher_program_cpu_percent", "gauge", "CPU usage of tracked processes", lambda p: p["cpu_percent"]),
+    ("launcher_program_rss_bytes", "gauge", "Resident memory of tracked processes", lambda p: p["rss_bytes"]),
+    ("launcher_program_group_cpu_seconds_total", "counter", "CPU time of all processes in the program's process groups",
+     lambda p: p["group"] and p["group"]["cpu_seconds"]),
+    ("launcher_program_group_processes", "gauge", "Active processes in the program's process groups",
+     lambda p: p["group"] and p["group"]["active_processes"]),
+    ("launcher_program_group_peak_memory_bytes", "gauge", "Peak committed memory of the program's job objects",
+     lambda p: p["group"] and p["group"]["peak_memory_bytes"]),
+]
+
+def format_prometheus(programs):
+    lines = []
+    for name, kind, help_text, value in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for program in programs:
+            v = value(program)
+            if v is None:
+                continue
+            lines.append(f'{name}{{name="{_prometheus_label(program["name"])}",path="{_prometheus_label(program["path"])}"}} {v}')
+    return "\n".join(lines) + "\n"
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """只返回MetricsServer中已生成好的内容，请求本身不做任何进程扫描"""
+    
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = self.server.owner.prometheus_body, "text/plain; version=0.0.4; charset=utf-8"
+        elif path in ("/", "/status"):
+            body, content_type = self.server.owner.json_body, "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer:
+    """本机HTTP状态接口，/status返回JSON，/metrics返回Prometheus文本格式"""
+    
+    def __init__(self, port):
+        self.json_body = b'{"programs": []}'
+        self.prometheus_body = b""
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        # 不设轮询间隔，没有请求时服务线程不会被唤醒
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(None,), daemon=True)
+        self.thread.start()
+    
+    def publish(self, programs, wakeups=None):
+        """预先生成两种格式的响应，替换引用即可被请求线程看到"""
+        self.json_body = json.dumps({"updated": time.time(), "scheduler_wakeups": wakeups, "programs": programs},
+                                    ensure_ascii=False).encode("utf-8")
+        text = format_prometheus(programs)
+        if wakeups is not None:
+            text += ("# HELP launcher_scheduler_wakeups_total Wakeups of the periodic task scheduler\n"
+                     "# TYPE launcher_scheduler_wakeups_total counter\n"
+                     f"launcher_scheduler_wakeups_total {wakeups}\n")
+        self.prometheus_body = text.encode("utf-8")
+    
+    def shutdown(self):
+        # serve_forever阻塞在select中，用一个连接把它唤醒以检查停止标记
+        stopper = threading.Thread(target=self.httpd.shutdown, daemon=True)
+        stopper.start()
+        while stopper.is_alive():
+            try:
+                socket.create_connection(self.httpd.server_address[:2], timeout=1).close()
+            except OSError:
+                pass
+            stopper.join(0.05)
+        self.httpd.server_close()
+
+# 周期任务调度
+class IdleScheduler(QObject):
+    """程序内所有周期性工作共用一个单次定时器
+    
+    到期时间相近的任务合并在一次唤醒中执行；窗口隐藏时允许退避的任务每执行一次间隔翻倍，
+    有新变化(activate)或窗口重新显示时恢复；没有启用的任务时定时器完全停止。"""
+    
+    # 窗口隐藏时间隔最多放大的倍数
+    MAX_BACKOFF = 8
+    # 在此时间(秒)内到期的任务与当前到期的任务一起执行
+    COALESCE_WINDOW = 1.0
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tasks = {}
+        self.hidden = True
+        self.wakeups = 0  # 定时器触发次数
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.CoarseTimer)
+        self.timer.timeout.connect(self.run_due)
+    
+    def add(self, name, interval, callback, backoff=True):
+        """注册周期任务(默认不启用)，callback返回假值表示没有需要关注的内容，任务停用直到再次activate"""
+        self.tasks[name] = {"interval": interval, "callback": callback, "backoff": backoff,
+                            "factor": 1, "due": None}
+    
+    def activate(self, name):
+        """启用任务并取消退避，已启用的任务不推迟下次执行时间"""
+        task = self.tasks[name]
+        task["factor"] = 1
+        due = time.monotonic() + task["interval"]
+        task["due"] = due if task["due"] is None else min(task["due"], due)
+        self.reschedule()
+    
+    def deactivate(self, name):
+        self.tasks[name]["due"] = None
+        self.reschedule()
+    
+    def set_hidden(self, hidden):
+        if hidden == self.hidden:
+            return
+        self.hidden = hidden
+        if not hidden:
+            # 窗口显示时恢复正常间隔
+            now = time.monotonic()
+            for task in self.tasks.values():
+                task["factor"] = 1
+                if task["due"] is not None:
+                    task["due"] = min(task["due"], now + task["interval"])
+            self.reschedule()
+    
+    def run_due(self):
+        self.wakeups += 1
+        now = time.monotonic()
+        for task in list(self.tasks.values()):
+            if task["due"] is None or task["due"] > now + self.COALESCE_WINDOW:
                 continue
-            
             try:
-                # 获取进程名称
-                process_name = row.selected_process or row.process_name or os.path.basename(row.get_program_path())
-                
-                # 关闭进程及其子进程
-                if psutil:
-                    for proc in psutil.process_iter(['pid', 'name', 'exe']):
-                        try:
-                            info = proc.info
-                            proc_name = info['name'].lower()
-                            # 检查进程名是否匹配
-                            if process_name.lower() in proc_name:
-                                # 结束进程树
-                                parent = psutil.Process(info['pid'])
-                                children = parent.children(recursive=True)
-                                
-                                # 先结束子进程
-                                for child in children:
-                                    try:
-                                        child.terminate()
-                                    except:
-                                        pass
-                                
-                                # 等待子进程结束
-                                psutil.wait_procs(children, timeout=3)
-                                
-                                # 结束父进程
-                                try:
-                                    parent.terminate()
-                                    parent.wait(3)
-                                except:
-                                    try:
-                                        parent.kill()
-                                    except:
-                                        pass
-                                
-                                self.status_update.emit(row.get_program_path(), False)
-                        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                            continue
+                keep = task["callback"]()
             except Exception as e:
-                print(f"关闭程序出错: {e}")
-        
-        self.finished.emit()
+                print(f"定时任务出错: {e}")
+                keep = True
+            if not keep:
+                task["due"] = None
+                continue
+            if self.hidden and task["backoff"]:
+                task["factor"] = min(task["factor"] * 2, self.MAX_BACKOFF)
+            task["due"] = time.monotonic() + task["interval"] * task["factor"]
+        self.reschedule()
     
-    def stop(self):
-        self.is_running = False
+    def reschedule(self):
+        dues = [task["due"] for task in self.tasks.values() if task["due"] is not None]
+        if not dues:
+            self.timer.stop()
+            return
+        delay = max(0.0, min(dues) - time.monotonic())
+        self.timer.start(int(delay * 1000))
 
 # 主窗口
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, config_file=CONFIG_FILE):
         super().__init__()
-        self.program_rows = []
-        self.config_file = "launcher_config.json"
+        self.entries = []       # 程序数据，窗口控件销毁后仍然保留
+        self.program_rows = []  # 当前界面上的程序行
+        self.ui_built = False
+        self.config_file = config_file
         self.tray_icon = None
         self.launch_thread = None
         self.close_thread = None
+        self.import_thread = None
+        self.rescan_threads = {}  # path -> ProcessRescanThread
+        self.tuning_thread = None
+        self.deferred_thread = None
+        self.deferred_entries = []  # 等待关键程序启动完成后进入延后队列的程序
+        self.launch_plan = None     # 已校验的预编译启动计划(按计划顺序排列的程序)
+        self.settings = dict(DEFAULT_SETTINGS)
         self.is_closing = False  # 标记是否正在关闭程序
+        self.scheduler = IdleScheduler(self)  # 所有周期任务共用的调度器
+        
+        # 启动历史，数据库不可用时不影响正常使用
+        try:
+            self.history = LaunchHistory(HISTORY_FILE)
+        except sqlite3.Error as e:
+            print(f"打开启动历史数据库出错: {e}")
+            self.history = None
         
         # 设置应用图标 - 修复图标显示问题
         app_icon = get_app_icon()
@@ -662,6 +3355,47 @@ class MainWindow(QMainWindow):
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setAttribute(Qt.WA_TranslucentBackground)
         
+        # 加载配置
+        self.load_config()
+        
+        # 如果没有程序，添加3个默认行
+        if not self.entries:
+            for _ in range(3):
+                self.add_program_entry()
+        
+        # 创建界面；低内存模式下等第一次显示窗口时再创建，常驻托盘启动时不占用控件内存
+        if not self.settings["low_memory_tray"]:
+            self.build_ui()
+        
+        # 设置系统托盘
+        self.setup_system_tray()
+        
+        # 定期对已启动程序后来产生的子进程补充应用调度设置
+        self.scheduler.add("tuning", 5, self.reapply_tuning)
+        
+        # 已启动进程的退出通知，用于更新运行状态
+        self.exit_watcher = ProcessExitWatcher(self)
+        self.exit_watcher.process_exited.connect(self.on_process_exited)
+        
+        # 单实例服务，接收后续启动转发过来的命令
+        self.instance_server = None
+        self.setup_instance_server()
+        
+        # 启动前的页缓存预读
+        self.prefetcher = Prefetcher(PREFETCH_FILE, int(self.settings["prefetch_budget_mb"]) * 1024 * 1024)
+        
+        # 可选的本机状态接口
+        self.metrics_server = None
+        self.metrics_procs = {}
+        self.setup_metrics_server()
+        
+        # 诊断: 界面线程卡顿检测
+        self.stall_detector = None
+        if DIAGNOSTICS["stall_ms"]:
+            self.stall_detector = StallDetector(DIAGNOSTICS["stall_ms"], self)
+    
+    def build_ui(self):
+        """创建主窗口控件并为每个程序创建一行"""
         # 创建主部件
         central_widget = QWidget()
         central_widget.setStyleSheet("""
@@ -769,6 +3503,30 @@ class MainWindow(QMainWindow):
         self.save_config_btn.clicked.connect(self.save_config)
         top_buttons_layout.addWidget(self.save_config_btn)
         
+        self.import_btn = QPushButton("批量导入")
+        self.import_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #3C6496;
+                color: white;
+                border: none;
+                border-radius: 3px;
+                padding: 8px 15px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #4A7BB0;
+            }
+            QPushButton:pressed {
+                background-color: #32527A;
+            }
+            QPushButton:disabled {
+                background-color: #4B4B4B;
+                color: #909090;
+            }
+        """)
+        self.import_btn.clicked.connect(self.import_programs)
+        top_buttons_layout.addWidget(self.import_btn)
+        
         top_buttons_layout.addStretch()
         content_layout.addLayout(top_buttons_layout)
         
@@ -804,6 +3562,9 @@ class MainWindow(QMainWindow):
         
         # 添加程序行标题
         header_layout = QHBoxLayout()
+        icon_header = QLabel("")
+        icon_header.setFixedWidth(24)
+        header_layout.addWidget(icon_header)
         header_layout.addWidget(QLabel("程序路径"), 4)
         header_layout.addWidget(QLabel("操作"), 1)
         header_layout.addWidget(QLabel("状态"), 2)
@@ -826,16 +3587,99 @@ class MainWindow(QMainWindow):
         
         main_layout.addWidget(content_widget, 1)
         
-        # 加载配置
-        self.load_config()
-        
-        # 如果没有程序行，添加3个默认行
-        if not self.program_rows:
-            for _ in range(3):
-                self.add_program_row()
+        self.ui_built = True
+        self.program_rows = []
+        for entry in self.entries:
+            self.create_row(entry)
         
-        # 设置系统托盘
-        self.setup_system_tray()
+        # 重建界面时后台任务可能仍在进行
+        busy = any(t and t.isRunning() for t in (self.launch_thread, self.close_thread))
+        self.set_actions_enabled(not busy)
+        if self.import_thread and self.import_thread.isRunning():
+            self.import_btn.setEnabled(False)
+            self.import_btn.setText("解析中...")
+    
+    def teardown_ui(self):
+        """销毁主窗口控件，只保留托盘图标和程序数据"""
+        if not self.ui_built:
+            return
+        self.ui_built = False
+        self.program_rows = []
+        widget = self.takeCentralWidget()
+        if widget:
+            widget.deleteLater()
+            # 控件在事件循环中延迟删除，删除后再归还内存
+            QTimer.singleShot(1000, trim_process_memory)
+    
+    def set_actions_enabled(self, enabled):
+        if not self.ui_built:
+            return
+        self.launch_all_btn.setEnabled(enabled)
+        self.close_all_btn.setEnabled(enabled)
+        self.add_program_btn.setEnabled(enabled)
+        self.save_config_btn.setEnabled(enabled)
+    
+    def setup_instance_server(self):
+        server = QLocalServer(self)
+        # 管理员实例也要允许普通权限的后续启动连接进来
+        server.setSocketOptions(QLocalServer.WorldAccessOption)
+        if not server.listen(INSTANCE_SERVER_NAME):
+            # 另一个实例同时启动并已开始监听时不能删除它的套接字
+            probe = connect_to_running_instance()
+            if probe is not None:
+                probe.disconnectFromServer()
+                print("另一个实例已在运行，单实例服务未启动")
+                return
+            # 上次异常退出可能残留了套接字文件
+            QLocalServer.removeServer(INSTANCE_SERVER_NAME)
+            if not server.listen(INSTANCE_SERVER_NAME):
+                print(f"单实例服务启动失败: {server.errorString()}")
+                return
+        server.newConnection.connect(self.on_instance_connection)
+        self.instance_server = server
+    
+    def setup_metrics_server(self):
+        port = self.settings["metrics_port"]
+        if not port or not psutil:
+            return
+        try:
+            self.metrics_server = MetricsServer(int(port))
+        except OSError as e:
+            print(f"状态接口启动失败: {e}")
+            return
+        # 采样间隔由用户设置，不做退避
+        self.scheduler.add("metrics", max(1, int(self.settings["metrics_interval"])), self.update_metrics, backoff=False)
+        if self.update_metrics():
+            self.scheduler.activate("metrics")
+    
+    def update_metrics(self):
+        """刷新状态接口的缓存内容，没有已跟踪的进程时返回False，之后数据不会变化无需继续采样"""
+        if not self.metrics_server:
+            return False
+        self.metrics_server.publish(collect_program_metrics(self.entries, self.metrics_procs), self.scheduler.wakeups)
+        return any(entry.launched_pids for entry in self.entries)
+    
+    def on_instance_connection(self):
+        while self.instance_server.hasPendingConnections():
+            socket = self.instance_server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self.read_instance_command(s))
+            socket.disconnected.connect(socket.deleteLater)
+    
+    def read_instance_command(self, socket):
+        while socket.canReadLine():
+            command = bytes(socket.readLine()).decode("utf-8", "ignore").strip()
+            self.handle_instance_command(command)
+    
+    def handle_instance_command(self, command):
+        """执行命令行或其他实例转发来的命令"""
+        if command == "show":
+            self.show_window()
+        elif command == "launch":
+            self.launch_all_programs()
+        elif command == "close":
+            self.close_all_programs()
+        else:
+            print(f"未知命令: {command}")
     
     def setup_system_tray(self):
         # 创建系统托盘图标 - 使用应用图标
@@ -855,6 +3699,10 @@ class MainWindow(QMainWindow):
         close_action.triggered.connect(self.close_all_programs)
         tray_menu.addAction(close_action)
         
+        # 单独启动某个程序，菜单在弹出时按当前程序列表重建
+        self.tray_programs_menu = tray_menu.addMenu("单独启动")
+        self.tray_programs_menu.aboutToShow.connect(self.populate_tray_programs_menu)
+        
         tray_menu.addSeparator()
         
         exit_action = QAction("退出", self)
@@ -866,11 +3714,30 @@ class MainWindow(QMainWindow):
         self.tray_icon.show()
         self.tray_icon.setToolTip("程序启动管理器")
     
+    def populate_tray_programs_menu(self):
+        self.tray_programs_menu.clear()
+        icons = get_icon_provider()
+        for entry in self.entries:
+            if not entry.is_valid():
+                continue
+            path = entry.get_program_path()
+            action = self.tray_programs_menu.addAction(os.path.splitext(os.path.basename(path))[0])
+            icon = icons.icon(path)
+            if icon is not None:
+                action.setIcon(icon)
+            else:
+                icons.request(path, action.setIcon)
+            action.triggered.connect(lambda checked=False, e=entry: self.launch_programs([e], allow_defer=False))
+        if self.tray_programs_menu.isEmpty():
+            self.tray_programs_menu.addAction("没有有效的程序").setEnabled(False)
+    
     def tray_icon_activated(self, reason):
         if reason == QSystemTrayIcon.DoubleClick:
             self.show_window()
     
     def show_window(self):
+        if not self.ui_built:
+            self.build_ui()
         self.show()
         self.raise_()
         if self.isMinimized():
@@ -881,6 +3748,9 @@ class MainWindow(QMainWindow):
     def minimize_to_tray(self):
         """最小化到系统托盘"""
         self.hide()
+        if self.settings["low_memory_tray"]:
+            self.teardown_ui()
+        take_memory_snapshot("tray")
         self.tray_icon.showMessage(
             "程序启动管理器",
             "程序已最小化到系统托盘",
@@ -888,28 +3758,82 @@ class MainWindow(QMainWindow):
             2000
         )
     
+    # 退出时等待关闭程序等后台任务的最长时间(秒)，超时后取消剩余任务
+    SHUTDOWN_TIMEOUT = 15
+    
     def close_application(self):
-        """真正关闭应用程序"""
+        """真正关闭应用程序: 界面先隐藏，关闭程序在后台完成后再退出，不阻塞事件循环"""
+        if self.is_closing:
+            return
         self.is_closing = True
-        # 关闭所有程序
-        self.close_all_programs()
+        self.hide()
         
-        # 确保线程完成
-        if self.launch_thread and self.launch_thread.isRunning():
-            self.launch_thread.stop()
-            self.launch_thread.wait()
+        # 停止启动和导入，延后队列不再启动
+        for thread in (self.launch_thread, self.import_thread):
+            if thread and thread.isRunning():
+                thread.stop()
+        self.cancel_deferred_launch()
         
-        if self.close_thread and self.close_thread.isRunning():
-            self.close_thread.stop()
-            self.close_thread.wait()
+        # 关闭所有程序
+        if not (self.close_thread and self.close_thread.isRunning()):
+            self.close_all_programs()
         
         # 退出系统托盘
         if self.tray_icon:
             self.tray_icon.hide()
         
+        self.shutdown_deadline = time.time() + self.SHUTDOWN_TIMEOUT
+        self.services_deadline = None  # 开始停止图标加载、退出监视等服务后的等待期限
+        self.finish_shutdown()
+    
+    def background_jobs(self):
+        threads = [self.launch_thread, self.deferred_thread, self.close_thread, self.import_thread, self.tuning_thread]
+        return [t for t in threads + list(self.rescan_threads.values()) if t and t.isRunning()]
+    
+    def finish_shutdown(self):
+        """后台任务全部结束后退出；超时则取消剩余任务，取消后仍未结束的任务不再等待
+        
+        退出过程中的轮询用单次定时器而不经过IdleScheduler: 调度器在此过程中会被停止，轮询也只持续到退出为止"""
+        jobs = self.background_jobs()
+        if jobs:
+            now = time.time()
+            if now < self.shutdown_deadline:
+                QTimer.singleShot(100, self.finish_shutdown)
+                return
+            if now < self.shutdown_deadline + 2:
+                for thread in jobs:
+                    thread.stop()
+                QTimer.singleShot(100, self.finish_shutdown)
+                return
+            print(f"退出时仍有 {len(jobs)} 个后台任务未结束")
+        
+        # 只发出停止请求，不在界面线程上等待线程结束
+        if self.services_deadline is None:
+            self.services_deadline = time.time() + 2
+            get_icon_provider().shutdown(wait=False)
+            self.exit_watcher.stop(wait=False)
+            self.prefetcher.stop()
+            if self.stall_detector:
+                self.stall_detector.stop()
+            self.scheduler.timer.stop()
+            if self.metrics_server:
+                threading.Thread(target=self.metrics_server.shutdown, daemon=True).start()
+        services_stopped = get_icon_provider().stopped() and self.exit_watcher.stopped()
+        if not services_stopped and time.time() < self.services_deadline:
+            QTimer.singleShot(50, self.finish_shutdown)
+            return
+        
         # 退出应用
         QApplication.quit()
     
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.scheduler.set_hidden(False)
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.scheduler.set_hidden(True)
+    
     def closeEvent(self, event):
         if self.is_closing:
             # 正在关闭程序，允许事件通过
@@ -919,6 +3843,9 @@ class MainWindow(QMainWindow):
         # 拦截关闭事件，改为最小化到托盘
         event.ignore()
         self.hide()
+        if self.settings["low_memory_tray"]:
+            self.teardown_ui()
+        take_memory_snapshot("tray")
         
         # 仅在窗口可见时显示提示
         if self.isVisible():
@@ -930,138 +3857,878 @@ class MainWindow(QMainWindow):
             )
     
     def add_program_row(self):
-        row = ProgramRow(manager=self)
+        self.add_program_entry()
+    
+    def add_program_entry(self, entry=None):
+        """添加一个程序，界面存在时同时创建对应的行"""
+        entry = entry or ProgramEntry()
+        self.entries.append(entry)
+        if self.ui_built:
+            self.create_row(entry)
+        return entry
+    
+    def create_row(self, entry):
+        row = ProgramRow(manager=self, entry=entry)
         self.program_rows.append(row)
         self.programs_layout.addWidget(row)
+        row.restore_status()
+        row.refresh_icon()
         
         # 如果行数超过5，启用滚动条
         if len(self.program_rows) > 5:
             self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        return row
+    
+    def import_programs(self):
+        """从文件夹批量导入程序和快捷方式"""
+        if self.import_thread and self.import_thread.isRunning():
+            return
+        directory = QFileDialog.getExistingDirectory(self, "选择要导入的文件夹")
+        if not directory:
+            return
+        existing = [entry.get_program_path() for entry in self.entries if entry.get_program_path()]
+        self.import_thread = ImportThread(directory, existing)
+        self.import_thread.progress.connect(self.on_import_progress)
+        self.import_thread.finished_import.connect(self.on_import_finished)
+        self.import_thread.start()
+        self.import_btn.setEnabled(False)
+        self.import_btn.setText("解析中...")
+    
+    def on_import_progress(self, done, total):
+        if self.ui_built:
+            self.import_btn.setText(f"解析中 {done}/{total}")
+    
+    def on_import_finished(self, results):
+        if self.ui_built:
+            self.import_btn.setEnabled(True)
+            self.import_btn.setText("批量导入")
+        if not results:
+            QMessageBox.information(self, "批量导入", "没有找到新的程序")
+            return
+        
+        # 一次性添加所有行，期间暂停界面刷新
+        if self.ui_built:
+            self.scroll_content.setUpdatesEnabled(False)
+        try:
+            empty_entries = [entry for entry in self.entries if not entry.get_program_path()]
+            for item in results:
+                entry = empty_entries.pop(0) if empty_entries else self.add_program_entry()
+                entry.path = item["path"]
+                entry.is_uwp = item["is_uwp"]
+                if item["is_uwp"]:
+                    entry.process_name = item["process_name"]
+                row = self.row_for_entry(entry)
+                if row:
+                    row.path_input.setText(item["path"])
+                    row.refresh_icon()
+            self.invalidate_launch_plan()
+        finally:
+            if self.ui_built:
+                self.scroll_content.setUpdatesEnabled(True)
+        QMessageBox.information(self, "批量导入", f"已导入 {len(results)} 个程序")
     
     def remove_program_row(self, row):
         if row in self.program_rows:
+            if row.get_program_path():
+                self.invalidate_launch_plan()
             self.program_rows.remove(row)
+            self.entries.remove(row.entry)
             row.deleteLater()
     
     def launch_all_programs(self):
+        self.launch_programs(self.entries, use_plan=True)
+    
+    def launch_programs(self, entries, allow_defer=True, use_plan=False):
         if self.launch_thread and self.launch_thread.isRunning():
             QMessageBox.warning(self, "警告", "程序启动中，请稍候...")
             return
         
-        valid_rows = [row for row in self.program_rows if row.is_valid()]
-        if not valid_rows:
+        # 启动全部程序(use_plan)且启动计划有效时直接按计划执行，不再逐个检查和解析路径
+        if use_plan and self.launch_plan is not None:
+            entries = list(self.launch_plan)
+        else:
+            entries = [entry for entry in entries if entry.is_valid()]
+        if not entries:
             QMessageBox.warning(self, "警告", "没有有效的程序路径")
             return
         
-        # 重置状态
-        for row in valid_rows:
-            row.set_status(False)
+        # 重新启动时放弃上一次尚未开始的延后队列
+        self.cancel_deferred_launch()
+        if allow_defer:
+            self.deferred_entries = [entry for entry in entries if entry.launch_priority == "deferred"]
+            entries = [entry for entry in entries if entry.launch_priority != "deferred"]
+        for entry in self.deferred_entries:
+            self.set_entry_pending(entry, "延后启动")
         
+        # 历史上启动最慢(或关键路径最长)的程序先启动，整体更早全部就绪
+        if self.history:
+            entries = self.history.order_rows(entries, self.settings["launch_order"])
+        
+        # 按启动顺序预读程序文件，延后启动的程序排在最后
+        if self.settings["prefetch_enabled"]:
+            self.prefetcher.start(entries + self.deferred_entries)
+        
+        # 不再统一重置状态，已在运行的行由启动线程立即标记为运行中
         # 创建并启动线程
-        self.launch_thread = LaunchThread(valid_rows)
+        self.launch_thread = LaunchThread(entries, self.history, self.settings["launch_concurrency"])
         self.launch_thread.status_update.connect(self.update_program_status)
+        self.launch_thread.process_started.connect(self.on_process_started)
         self.launch_thread.finished.connect(self.on_launch_finished)
+        self.launch_thread.progress.connect(
+            lambda *args: self.show_job_progress("launch_all_btn", "启动中", *args))
         self.launch_thread.start()
         
-        self.launch_all_btn.setEnabled(False)
-        self.close_all_btn.setEnabled(False)
-        self.add_program_btn.setEnabled(False)
-        self.save_config_btn.setEnabled(False)
+        self.set_actions_enabled(False)
     
-    def update_program_status(self, path, running, process_name):
+    def row_for_entry(self, entry):
         for row in self.program_rows:
-            if row.get_program_path() == path:
-                row.set_status(running, process_name)
-                if running and not row.process_name:
-                    row.process_name = process_name
+            if row.entry is entry:
+                return row
+        return None
+    
+    def entry_for_path(self, path):
+        for entry in self.entries:
+            if entry.get_program_path() == path:
+                return entry
+        return None
+    
+    def set_entry_status(self, entry, running, process_name=None):
+        """更新程序运行状态，界面已销毁时只更新数据"""
+        row = self.row_for_entry(entry)
+        if row:
+            row.set_status(running, process_name)
+        else:
+            entry.running = running
+            entry.pending = False
+            entry.status_text = process_name if running else None
+        # 状态接口的采样任务可能因没有跟踪的进程而停用，状态变化后恢复，避免/status停留在旧数据
+        if self.metrics_server:
+            self.scheduler.activate("metrics")
+    
+    def set_entry_pending(self, entry, text):
+        row = self.row_for_entry(entry)
+        if row:
+            row.set_pending(text)
+        else:
+            entry.pending = True
+            entry.status_text = text
+    
+    def invalidate_launch_plan(self):
+        """程序列表被修改后丢弃预编译的启动计划，下次保存配置时重新编译"""
+        if self.launch_plan is None:
+            return
+        self.launch_plan = None
+        for entry in self.entries:
+            entry.clear_plan()
+    
+    def update_program_status(self, path, running, process_name):
+        entry = self.entry_for_path(path)
+        if entry:
+            self.set_entry_status(entry, running, process_name)
+            if running and not entry.process_name:
+                entry.process_name = process_name
+    
+    def on_process_started(self, path, pid):
+        entry = self.entry_for_path(path)
+        if entry:
+            entry.launched_pids.add(pid)
+            if self.settings["prefetch_enabled"]:
+                self.prefetcher.record_later(path, pid)
+        self.exit_watcher.watch(pid)
+        self.scheduler.activate("tuning")
+        if self.metrics_server:
+            self.scheduler.activate("metrics")
+    
+    def on_process_exited(self, pid, exit_code):
+        for entry in self.entries:
+            if pid not in entry.launched_pids:
+                continue
+            entry.launched_pids.discard(pid)
+            entry.tuned_pids.discard(pid)
+            if entry.launched_pids:
+                break
+            entry.prune_groups()
+            if not entry.running:
                 break
+            # 跟踪的进程全部退出时在后台查找一次是否还有同一程序的其他进程(如启动器拉起的主程序)
+            self.rescan_entry(entry)
+            break
+        if self.metrics_server:
+            self.scheduler.activate("metrics")
+    
+    def rescan_entry(self, entry):
+        path = entry.get_program_path()
+        if path in self.rescan_threads:
+            return
+        if entry.is_uwp:
+            thread = ProcessRescanThread(path, None, entry.selected_process or entry.process_name)
+        else:
+            thread = ProcessRescanThread(path, entry.target, None)
+        thread.found.connect(self.on_rescan_found)
+        thread.finished.connect(lambda p=path: self.rescan_threads.pop(p, None))
+        self.rescan_threads[path] = thread
+        thread.start()
+    
+    def on_rescan_found(self, path, pids):
+        entry = self.entry_for_path(path)
+        if not entry:
+            return
+        for pid in pids:
+            entry.launched_pids.add(pid)
+            self.exit_watcher.watch(pid)
+        # 查找期间可能已重新启动，仍有跟踪的进程时保持运行状态
+        if not entry.launched_pids and entry.running:
+            self.set_entry_status(entry, False)
+    
+    def reapply_tuning(self):
+        """在后台对已启动进程的子进程应用调度设置，没有需要跟踪的进程时返回False
+        
+        已退出进程的清理由退出监视器负责，这里不修改launched_pids"""
+        work = [(entry, set(entry.launched_pids)) for entry in self.entries
+                if entry.has_tuning() and entry.launched_pids]
+        if not work or not psutil:
+            return False
+        # 上一次还没完成时跳过本次
+        if not (self.tuning_thread and self.tuning_thread.isRunning()):
+            self.tuning_thread = TuningThread(work)
+            self.tuning_thread.start()
+        return True
+    
+    def show_job_progress(self, button_name, label, done, total, current, eta):
+        """在按钮和托盘提示上显示任务进度"""
+        text = f"{label} {done}/{total}"
+        if eta >= 0 and done < total:
+            text += f" 约{int(eta + 0.5)}秒"
+        if self.tray_icon:
+            self.tray_icon.setToolTip(f"程序启动管理器 - {text}" + (f"\n{current}" if current else ""))
+        if self.ui_built:
+            getattr(self, button_name).setText(text)
+    
+    def reset_job_progress(self):
+        if self.tray_icon:
+            self.tray_icon.setToolTip("程序启动管理器")
+        if self.ui_built:
+            self.launch_all_btn.setText("一键开启")
+            self.close_all_btn.setText("一键关闭")
     
     def on_launch_finished(self):
-        self.launch_all_btn.setEnabled(True)
-        self.close_all_btn.setEnabled(True)
-        self.add_program_btn.setEnabled(True)
-        self.save_config_btn.setEnabled(True)
+        self.set_actions_enabled(True)
+        self.reset_job_progress()
+        take_memory_snapshot("launch")
+        
+        # 关键程序已启动完成，延后启动的程序进入后台队列
+        if self.deferred_entries and not self.is_closing:
+            entries = [entry for entry in self.deferred_entries if entry in self.entries]
+            self.deferred_entries = []
+            self.start_deferred_launch(entries)
+    
+    def start_deferred_launch(self, entries):
+        if not entries:
+            return
+        self.deferred_thread = DeferredLaunchThread(entries, self.settings, self.history, parent=self)
+        self.deferred_thread.status_update.connect(self.update_program_status)
+        self.deferred_thread.process_started.connect(self.on_process_started)
+        self.deferred_thread.waiting_update.connect(self.on_deferred_waiting)
+        self.deferred_thread.finished.connect(self.on_deferred_finished)
+        self.deferred_thread.start()
+    
+    def on_deferred_waiting(self, text):
+        if not self.deferred_thread:
+            return
+        for entry in self.sender().programs:
+            if entry.pending:
+                self.set_entry_pending(entry, text)
+    
+    def on_deferred_finished(self):
+        # 被取消时仍在等待的行恢复为未运行
+        thread = self.sender()
+        for entry in thread.programs:
+            if entry.pending:
+                self.set_entry_status(entry, False)
+    
+    def cancel_deferred_launch(self):
+        """取消尚未开始的延后启动队列"""
+        for entry in self.deferred_entries:
+            if entry.pending:
+                self.set_entry_status(entry, False)
+        self.deferred_entries = []
+        # 不等待线程结束，等待中的任务收到取消后很快退出
+        if self.deferred_thread and self.deferred_thread.isRunning():
+            self.deferred_thread.stop()
     
     def close_all_programs(self):
         if self.close_thread and self.close_thread.isRunning():
             QMessageBox.warning(self, "警告", "程序关闭中，请稍候...")
             return
         
-        valid_rows = [row for row in self.program_rows if row.is_valid()]
-        if not valid_rows:
+        valid_entries = [entry for entry in self.entries if entry.is_valid()]
+        if not valid_entries:
             QMessageBox.warning(self, "警告", "没有有效的程序路径")
             return
         
+        # 关闭全部时不再启动还在排队的程序
+        self.cancel_deferred_launch()
+        
         # 创建并启动线程
-        self.close_thread = CloseThread(valid_rows)
+        self.close_thread = CloseThread(valid_entries, self.exit_watcher, self.history)
         self.close_thread.status_update.connect(self.update_close_status)
         self.close_thread.finished.connect(self.on_close_finished)
+        self.close_thread.progress.connect(
+            lambda *args: self.show_job_progress("close_all_btn", "关闭中", *args))
         self.close_thread.start()
         
-        self.launch_all_btn.setEnabled(False)
-        self.close_all_btn.setEnabled(False)
-        self.add_program_btn.setEnabled(False)
-        self.save_config_btn.setEnabled(False)
+        self.set_actions_enabled(False)
     
     def update_close_status(self, path, running):
-        for row in self.program_rows:
-            if row.get_program_path() == path:
-                row.set_status(False)
-                break
+        entry = self.entry_for_path(path)
+        if entry:
+            self.set_entry_status(entry, False)
     
     def on_close_finished(self):
-        self.launch_all_btn.setEnabled(True)
-        self.close_all_btn.setEnabled(True)
-        self.add_program_btn.setEnabled(True)
-        self.save_config_btn.setEnabled(True)
+        self.set_actions_enabled(True)
+        self.reset_job_progress()
+        take_memory_snapshot("close")
     
     def save_config(self):
         config = []
-        for row in self.program_rows:
-            path = row.get_program_path()
-            if path and os.path.exists(path):
-                config.append({
-                    "path": path,
-                    "is_uwp": row.is_uwp,
-                    "process_name": row.process_name,
-                    "selected_process": row.selected_process
-                })
+        for entry in self.entries:
+            if entry.is_valid():
+                config.append(entry.to_config())
         
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+                json.dump({"settings": self.settings, "programs": config}, f, indent=2, ensure_ascii=False)
+            self.save_launch_plan()
             QMessageBox.information(self, "成功", "配置已保存")
         except Exception as e:
             QMessageBox.warning(self, "错误", f"保存配置失败: {str(e)}")
     
+    def save_launch_plan(self):
+        """编译并保存启动计划，之后的启动直接执行该计划"""
+        plan = compile_launch_plan(self.entries, self.config_file, LaunchThread.PROCESS_DETECT_TIMEOUT)
+        try:
+            with open(PLAN_FILE, 'w', encoding='utf-8') as f:
+                json.dump(plan, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存启动计划出错: {e}")
+            return
+        self.launch_plan = load_launch_plan(PLAN_FILE, self.config_file, self.entries)
+    
     def load_config(self):
         if not os.path.exists(self.config_file):
             return
         
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            self.settings, config = read_config_file(self.config_file)
+            self.entries = [ProgramEntry.from_config(item) for item in config]
             
-            # 清空现有行
-            for row in self.program_rows[:]:
-                self.remove_program_row(row)
-            
-            # 加载配置
-            for item in config:
-                row = ProgramRow(manager=self)
-                row.path_input.setText(item.get("path", ""))
-                row.is_uwp = item.get("is_uwp", False)
-                row.process_name = item.get("process_name")
-                row.selected_process = item.get("selected_process")
-                self.program_rows.append(row)
-                self.programs_layout.addWidget(row)
+            # 配置和程序文件都没有变化时直接使用上次编译的启动计划
+            self.launch_plan = load_launch_plan(PLAN_FILE, self.config_file, self.entries)
             
             # 至少保留3行
-            while len(self.program_rows) < 3:
-                self.add_program_row()
+            while len(self.entries) < 3:
+                self.add_program_entry()
         except Exception as e:
             QMessageBox.warning(self, "错误", f"加载配置失败: {str(e)}")
 
+# 托盘常驻内存自检
+# 在子进程中以隐藏窗口的方式启动，分别测量普通模式和低内存模式下的常驻内存。
+
+def measure_tray_memory(low_memory, rows, shown=False):
+    """创建主窗口并隐藏到托盘后返回当前进程的常驻内存(字节)
+    
+    shown为False时与从托盘启动一样从不显示窗口；为True时先显示窗口再最小化到托盘"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication([sys.argv[0]])
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, "config.json")
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump({"settings": {"low_memory_tray": low_memory},
+                       "programs": [{"path": sys.executable} for _ in range(rows)]}, f)
+        window = MainWindow(config_file)
+        if shown:
+            window.resize(900, 600)
+            window.show_window()
+            app.processEvents()
+            window.minimize_to_tray()
+        # 处理完延迟删除和之后的内存归还再测量
+        deadline = time.time() + 1.5
+        while time.time() < deadline:
+            app.processEvents()
+            QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+            time.sleep(0.05)
+        rss = psutil.Process().memory_info().rss
+        get_icon_provider().shutdown()
+        window.exit_watcher.stop()
+        window.prefetcher.stop()
+    return rss
+
+MEMORY_MODES = ("normal", "low", "normal-shown", "low-shown")
+
+def run_memory_selftest(rows=60):
+    """在子进程中分别测量普通模式和低内存模式隐藏到托盘后的常驻内存，
+    包括从托盘启动和显示后再最小化两种情况，低内存模式都应更小"""
+    if not psutil:
+        print("需要psutil")
+        return 1
+    # 打包后的程序没有脚本路径，sys.executable本身就是启动器
+    command = [sys.executable] if getattr(sys, "frozen", False) else [sys.executable, os.path.abspath(sys.argv[0])]
+    results = {}
+    for mode in MEMORY_MODES:
+        output = subprocess.run(command + ["memory", "--measure", mode, "--rows", str(rows)],
+                                capture_output=True, text=True, timeout=120)
+        lines = output.stdout.strip().splitlines()
+        if output.returncode != 0 or not lines:
+            print(f"{mode} 模式测量失败: {output.stderr.strip()}")
+            return 1
+        results[mode] = json.loads(lines[-1])["rss"]
+        print(f"{mode:<14}{results[mode] / 1024 / 1024:>10.1f} MB")
+    ok = True
+    for start, normal, low in (("从托盘启动", "normal", "low"), ("显示后最小化", "normal-shown", "low-shown")):
+        saved = (results[normal] - results[low]) / 1024 / 1024
+        ok = ok and results[low] < results[normal]
+        print(f"{start}: 低内存模式节省 {saved:.1f} MB")
+    print("通过" if ok else "失败")
+    return 0 if ok else 1
+
+def run_scheduler_selftest(span=60.0, max_per_minute=6):
+    """从托盘启动主窗口并跟踪一个一直运行的已启动程序，运行span秒，
+    检查调度器和进程退出监视器合计的每分钟唤醒次数不超过上限，返回退出码"""
+    if not psutil:
+        print("需要psutil")
+        return 1
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, "config.json")
+        with open(config_file, 'w', encoding='utf-8') as f:
+            # 设置了优先级的程序启动后会周期补充调度设置
+            json.dump({"settings": {}, "programs": [{"path": sys.executable, "priority": "normal"}]}, f)
+        window = MainWindow(config_file)
+        # 用本进程代替已启动的程序，测试期间一直运行
+        window.on_process_started(sys.executable, os.getpid())
+        QTimer.singleShot(int(span * 1000), app.quit)
+        app.exec_()
+        window.scheduler.timer.stop()
+        scheduler_wakeups = window.scheduler.wakeups
+        watcher_wakeups = window.exit_watcher.wakeups
+        get_icon_provider().shutdown()
+        window.exit_watcher.stop()
+        window.prefetcher.stop()
+    per_minute = (scheduler_wakeups + watcher_wakeups) * 60 / span
+    ok = per_minute <= max_per_minute
+    print(f"隐藏 {span:g} 秒: 调度器唤醒 {scheduler_wakeups} 次，退出监视器唤醒 {watcher_wakeups} 次")
+    print(f"每分钟 {per_minute:.1f} 次 (上限 {max_per_minute:g})")
+    print("通过" if ok else "失败")
+    return 0 if ok else 1
+
+# 进程表压力测试
+# 用合成的进程表替换psutil，测量关闭程序、进程选择对话框加载和搜索过滤在大量进程下的耗时。
+
+class SyntheticProcess:
+    """模拟psutil.Process中本程序用到的接口"""
+    
+    def __init__(self, table, pid, ppid, name, exe):
+        self.table = table
+        self.pid = pid
+        self.ppid = ppid
+        self.info = {"pid": pid, "ppid": ppid, "name": name, "exe": exe, "create_time": table.boot_time + pid * 0.001}
+    
+    def children(self, recursive=False):
+        # 与psutil一样每次调用都遍历整个进程表建立父子关系
+        by_parent = {}
+        for proc in self.table.process_iter():
+            by_parent.setdefault(proc.ppid, []).append(proc)
+        found = []
+        stack = list(by_parent.get(self.pid, []))
+        while stack:
+            proc = stack.pop()
+            found.append(proc)
+            if recursive:
+                stack.extend(by_parent.get(proc.pid, []))
+        return found
+    
+    def terminate(self):
+        self.table.alive.discard(self.pid)
+    
+    kill = terminate
+
+class SyntheticProcessTable:
+    """合成的进程表: count个进程，其中collisions个与目标同名，每个目标带depth层子进程"""
+    
+    TARGET_NAME = "stress_target.exe"
+    
+    def __init__(self, count, collisions=10, depth=8):
+        self.boot_time = time.time() - 3600
+        self.procs = {}
+        pid = 1
+        # 与目标同名的进程及其子进程链
+        for i in range(collisions):
+            ppid = 0
+            for level in range(depth + 1):
+                name = self.TARGET_NAME if level == 0 else f"stress_worker{level}.exe"
+                self.procs[pid] = SyntheticProcess(self, pid, ppid, name, f"C:\\Stress\\{name}")
+                ppid = pid
+                pid += 1
+        # 其余进程按depth长度连成链，模拟较深的进程树
+        while pid <= count:
+            name = f"svc{pid % 500}.exe"
+            ppid = pid - 1 if pid % max(1, depth) else 0
+            self.procs[pid] = SyntheticProcess(self, pid, ppid, name, f"C:\\Program Files\\Svc{pid % 500}\\{name}")
+            pid += 1
+        self.alive = set(self.procs)
+    
+    def process_iter(self, attrs=None):
+        for pid in list(self.procs):
+            if pid in self.alive:
+                yield self.procs[pid]
+    
+    def Process(self, pid):
+        if pid not in self.alive:
+            raise psutil.NoSuchProcess(pid)
+        return self.procs[pid]
+    
+    def wait_for_exit(self, pids, timeout, cancel=None):
+        """代替ProcessExitWatcher，合成进程被结束后立即视为已退出"""
+        return {pid: 0 for pid in pids if pid not in self.alive}
+    
+    def interrupt(self):
+        pass
+
+def _elapsed_ms(func):
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+def run_stress(sizes, collisions, depth, budgets, query="stress_target", output=None):
+    """逐个规模运行压力测试，返回退出码(有超出耗时上限的项目时为1)
+    
+    budgets为每1万个进程允许的毫秒数: {"scan", "picker", "filter", "close"}"""
+    global PROCESS_SOURCE
+    if not psutil:
+        print("压力测试需要psutil")
+        return 2
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    
+    # 关闭测试需要一个存在的程序路径
+    fd, target_path = tempfile.mkstemp(suffix="_" + SyntheticProcessTable.TARGET_NAME)
+    os.close(fd)
+    
+    results = []
+    failed = False
+    try:
+        for size in sizes:
+            table = SyntheticProcessTable(size, collisions, depth)
+            PROCESS_SOURCE = table
+            measured = {}
+            measured["scan"] = _elapsed_ms(snapshot_processes)
+            dialog = None
+            
+            def open_picker():
+                nonlocal dialog
+                dialog = ProcessSelectorDialog()
+            measured["picker"] = _elapsed_ms(open_picker)
+            
+            # 逐字输入搜索词，取最慢一次按键
+            keystrokes = [_elapsed_ms(lambda text=query[:i]: dialog.filter_processes(text)) for i in range(1, len(query) + 1)]
+            measured["filter"] = max(keystrokes)
+            dialog.deleteLater()
+            
+            entry = ProgramEntry(path=target_path, process_name=SyntheticProcessTable.TARGET_NAME)
+            measured["close"] = _elapsed_ms(CloseThread([entry], table).run)
+            app.processEvents()
+            
+            scale = max(1.0, size / 10000)
+            row = {"size": size, "collisions": collisions, "depth": depth}
+            for key, value in measured.items():
+                limit = budgets[key] * scale
+                row[key] = {"ms": round(value, 1), "limit": round(limit, 1), "ok": value <= limit}
+                failed = failed or value > limit
+            results.append(row)
+    finally:
+        PROCESS_SOURCE = None
+        get_icon_provider().shutdown()
+        os.remove(target_path)
+    
+    lines = [f"{'进程数':<10}{'扫描':>14}{'对话框加载':>14}{'单次按键过滤':>14}{'关闭':>14}"]
+    for row in results:
+        cells = [f"{row[key]['ms']:>9.1f}ms{'' if row[key]['ok'] else ' ✗':<3}" for key in ("scan", "picker", "filter", "close")]
+        lines.append(f"{row['size']:<10}" + "".join(f"{c:>14}" for c in cells))
+    lines.append("")
+    lines.append("结果: " + ("失败，有项目超出耗时上限" if failed else "通过"))
+    print("\n".join(lines))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+# 远程代理
+# 代理在TCP端口上接收启动/关闭命令，控制端可同时向多台机器下发并汇总每个程序的结果。
+# 协议为每行一个JSON对象: 服务端先发送随机数，双方用共享密钥对两个随机数做HMAC互相验证，
+# 之后的每条消息都带有用会话密钥计算的mac字段和会话内递增的序号seq，防止同一会话内重放或反射消息。
+
+AGENT_PROTOCOL_VERSION = 1
+AGENT_DEFAULT_PORT = 47800
+AGENT_COMMANDS = ("launch", "close", "status")
+
+def _agent_mac(key, *parts):
+    return hmac.new(key, "|".join(parts).encode("utf-8"), hashlib.sha256).hexdigest()
+
+def _mac_matches(mac, expected):
+    """比较对方发来的mac，类型不对或含非ASCII字符时视为不匹配"""
+    return isinstance(mac, str) and hmac.compare_digest(mac.encode("utf-8"), expected.encode("ascii"))
+
+def _sign_message(key, message, sender, seq):
+    """sender为"client"或"server"，seq为会话内的消息序号"""
+    message = dict(message, seq=seq)
+    body = json.dumps(message, sort_keys=True, ensure_ascii=False)
+    return dict(message, mac=_agent_mac(key, sender, body))
+
+def _verify_message(key, message, sender, seq):
+    """校验mac和序号并去掉mac字段，校验失败时返回None"""
+    if not isinstance(message, dict):
+        return None
+    mac = message.pop("mac", None)
+    if type(message.get("seq")) is not int or message["seq"] != seq:
+        return None
+    body = json.dumps(message, sort_keys=True, ensure_ascii=False)
+    return message if _mac_matches(mac, _agent_mac(key, sender, body)) else None
+
+def _send_line(wfile, message):
+    wfile.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+    wfile.flush()
+
+def _read_line(rfile):
+    line = rfile.readline(1024 * 1024)
+    if not line:
+        raise ConnectionError("连接已关闭")
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("消息格式错误")
+    return message
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    # 只对代理自己的服务器设置，不修改标准库类的默认值
+    allow_reuse_address = True
+    daemon_threads = True
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # 每个连接一个线程，命令在本线程中执行，解析快捷方式需要COM
+        if pythoncom:
+            pythoncom.CoInitialize()
+        agent = self.server.agent
+        secret = agent.secret
+        server_nonce = secrets.token_hex(16)
+        try:
+            _send_line(self.wfile, {"type": "hello", "version": AGENT_PROTOCOL_VERSION, "nonce": server_nonce})
+            auth = _read_line(self.rfile)
+            client_nonce = auth.get("nonce")
+            if not isinstance(client_nonce, str) or not client_nonce or not _mac_matches(auth.get("mac"), _agent_mac(secret, "client", server_nonce, client_nonce)):
+                _send_line(self.wfile, {"type": "auth", "ok": False})
+                return
+            session_key = _agent_mac(secret, "session", server_nonce, client_nonce).encode("ascii")
+            _send_line(self.wfile, {"type": "auth", "ok": True,
+                                    "mac": _agent_mac(secret, "server", client_nonce, server_nonce)})
+            
+            seq = 0
+            while True:
+                seq += 1
+                request = _verify_message(session_key, _read_line(self.rfile), "client", seq)
+                if request is None:
+                    _send_line(self.wfile, {"type": "error", "error": "消息校验失败"})
+                    return
+                result = agent.execute(request.get("command"))
+                result["id"] = request.get("id")
+                _send_line(self.wfile, _sign_message(session_key, result, "server", seq))
+        except (ConnectionError, OSError, ValueError):
+            return
+
+class LauncherAgent:
+    """无界面的启动/关闭代理，直接在连接线程中运行LaunchThread/CloseThread的任务"""
+    
+    def __init__(self, config_file, secret, host="127.0.0.1", port=AGENT_DEFAULT_PORT):
+        self.config_file = config_file
+        self.secret = secret.encode("utf-8")
+        self.job_lock = threading.Lock()  # 同一时间只执行一个启动或关闭任务
+        self.entries = []
+        self.watcher = ProcessExitWatcher()
+        try:
+            self.history = LaunchHistory(HISTORY_FILE)
+        except sqlite3.Error as e:
+            print(f"打开启动历史数据库出错: {e}")
+            self.history = None
+        self.server = AgentServer((host, port), AgentRequestHandler)
+        self.server.agent = self
+    
+    def load_entries(self):
+        """每次执行命令前重新读取配置，保留已跟踪的PID和进程归属容器"""
+        settings, config = read_config_file(self.config_file)
+        known = {entry.get_program_path(): entry for entry in self.entries}
+        entries = []
+        for item in config:
+            entry = ProgramEntry.from_config(item)
+            old = known.pop(entry.get_program_path(), None)
+            if old:
+                entry.launched_pids = old.launched_pids
+                entry.launch_count = old.launch_count
+                entry.last_launch_seconds = old.last_launch_seconds
+                old.prune_groups()
+                entry.groups = old.groups
+            entries.append(entry)
+        # 已从配置中删除的程序不再由本程序关闭，释放其容器
+        for old in known.values():
+            for group in old.groups:
+                group.release()
+        self.entries = entries
+        plan = load_launch_plan(PLAN_FILE, self.config_file, entries)
+        return settings, plan if plan is not None else [entry for entry in entries if entry.is_valid()]
+    
+    def execute(self, command):
+        if command not in AGENT_COMMANDS:
+            return {"type": "result", "command": command, "ok": False, "error": "未知命令"}
+        with self.job_lock:
+            started = time.time()
+            try:
+                settings, entries = self.load_entries()
+                rows = {entry.get_program_path(): {"path": entry.get_program_path(), "running": False,
+                                                   "process_name": None, "pids": [], "seconds": None}
+                        for entry in entries}
+                if command == "launch":
+                    self.run_launch(settings, entries, rows)
+                elif command == "close":
+                    self.run_close(entries, rows)
+                else:
+                    self.collect_status(entries, rows)
+            except Exception as e:
+                return {"type": "result", "command": command, "ok": False, "error": str(e)}
+            return {"type": "result", "command": command, "ok": True, "host": socket.gethostname(),
+                    "elapsed": round(time.time() - started, 3), "programs": list(rows.values())}
+    
+    def run_launch(self, settings, entries, rows):
+        if self.history:
+            entries = self.history.order_rows(entries, settings["launch_order"])
+        job = LaunchThread(entries, self.history, settings["launch_concurrency"])
+        
+        def on_status(path, running, process_name):
+            if path in rows:
+                rows[path].update(running=running, process_name=process_name)
+        
+        def on_started(path, pid):
+            if path in rows and pid not in rows[path]["pids"]:
+                rows[path]["pids"].append(pid)
+        
+        job.status_update.connect(on_status, Qt.DirectConnection)
+        job.process_started.connect(on_started, Qt.DirectConnection)
+        job.run()
+        for entry in entries:
+            entry.launched_pids.update(rows[entry.get_program_path()]["pids"])
+            rows[entry.get_program_path()]["seconds"] = entry.last_launch_seconds
+    
+    def run_close(self, entries, rows):
+        job = CloseThread(entries, self.watcher, self.history)
+        item_started = {}
+        
+        def on_progress(done, total, current, eta):
+            if done < total:
+                item_started[entries[done].get_program_path()] = time.time()
+        
+        def on_status(path, running):
+            if path in rows and rows[path]["seconds"] is None:
+                rows[path]["seconds"] = round(time.time() - item_started.get(path, time.time()), 3)
+        
+        job.progress.connect(on_progress, Qt.DirectConnection)
+        job.status_update.connect(on_status, Qt.DirectConnection)
+        job.run()
+        # 按关闭后的实际进程状态填写结果，未能结束的程序仍报告为运行中
+        self.collect_status(entries, rows)
+        for entry in entries:
+            entry.launched_pids.intersection_update(rows[entry.get_program_path()]["pids"])
+    
+    def collect_status(self, entries, rows):
+        snapshot = snapshot_processes()
+        for entry in entries:
+            path = entry.get_program_path()
+            if entry.is_uwp:
+                pids = match_snapshot(snapshot, None, entry.selected_process or entry.process_name, entry.launched_pids)
+            else:
+                pids = match_snapshot(snapshot, entry.target or resolve_program_target(path), None, entry.launched_pids)
+            rows[path].update(running=bool(pids), pids=pids,
+                              process_name=snapshot[pids[0]][0] if pids else None)
+    
+    def serve_forever(self):
+        host, port = self.server.server_address[:2]
+        print(f"代理已在 {host}:{port} 上监听")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.server_close()
+            self.watcher.stop()
+
+def send_agent_command(address, secret, command, timeout=120):
+    """连接一个代理并执行命令，返回代理的结果；认证失败或连接出错时抛出异常"""
+    host, _, port = address.rpartition(":")
+    if not host:
+        host, port = address, AGENT_DEFAULT_PORT
+    secret = secret.encode("utf-8")
+    with socket.create_connection((host, int(port)), timeout=10) as sock:
+        sock.settimeout(timeout)
+        rfile = sock.makefile("rb")
+        wfile = sock.makefile("wb")
+        hello = _read_line(rfile)
+        if hello.get("version") != AGENT_PROTOCOL_VERSION:
+            raise ConnectionError(f"协议版本不一致: {hello.get('version')}")
+        server_nonce = hello.get("nonce")
+        if not isinstance(server_nonce, str) or not server_nonce:
+            raise ConnectionError("代理的握手消息无效")
+        client_nonce = secrets.token_hex(16)
+        _send_line(wfile, {"type": "auth", "nonce": client_nonce,
+                           "mac": _agent_mac(secret, "client", server_nonce, client_nonce)})
+        auth = _read_line(rfile)
+        if not auth.get("ok"):
+            raise PermissionError("代理拒绝了共享密钥")
+        if not _mac_matches(auth.get("mac"), _agent_mac(secret, "server", client_nonce, server_nonce)):
+            raise PermissionError("代理的身份校验失败")
+        session_key = _agent_mac(secret, "session", server_nonce, client_nonce).encode("ascii")
+        request_id = secrets.token_hex(8)
+        _send_line(wfile, _sign_message(session_key, {"type": "command", "command": command, "id": request_id}, "client", 1))
+        result = _verify_message(session_key, _read_line(rfile), "server", 1)
+        if result is None or result.get("id") != request_id:
+            raise PermissionError("代理返回的结果校验失败")
+        return result
+
+def fan_out_agents(agents, secret, command, timeout=120):
+    """同时向多个代理下发命令，返回 {地址: (结果, 错误信息)}"""
+    def call(address):
+        started = time.time()
+        try:
+            result = send_agent_command(address, secret, command, timeout)
+            result["round_trip"] = round(time.time() - started, 3)
+            return result, None
+        except Exception as e:
+            return None, str(e)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(32, len(agents)))) as pool:
+        return dict(zip(agents, pool.map(call, agents)))
+
+def format_agent_results(results):
+    lines = []
+    for address, (result, error) in results.items():
+        if error or not result.get("ok"):
+            lines.append(f"[{address}] 失败: {error or result.get('error')}")
+            continue
+        lines.append(f"[{address}] {result.get('host', '')} {result['command']} "
+                     f"耗时 {result['elapsed']:.2f} 秒 (往返 {result['round_trip']:.2f} 秒)")
+        for row in result["programs"]:
+            state = "运行中" if row["running"] else "未运行"
+            seconds = f"{row['seconds']:.2f}秒" if row["seconds"] is not None else "-"
+            pids = ",".join(str(pid) for pid in row["pids"]) or "-"
+            lines.append(f"    {os.path.basename(row['path']):<32}{state:<6}{seconds:>10}  PID {pids}")
+    return "\n".join(lines)
+
 # 检查依赖
 def check_dependencies():
     missing_deps = []
@@ -1074,15 +4741,144 @@ def check_dependencies():
         msg = "缺少以下依赖库，部分功能将受限:\n" + "\n".join(missing_deps)
         msg += "\n\n建议使用以下命令安装:\n"
         msg += "pip install psutil pywin32"
-        app = QApplication(sys.argv)
         QMessageBox.warning(None, "依赖缺失", msg)
-        app.quit()
+
+def attach_parent_console():
+    """无控制台方式打包(console=False)时没有标准输出，命令行子命令的输出接到启动它的控制台"""
+    if sys.stdout is not None and sys.stderr is not None:
+        return
+    try:
+        # ATTACH_PARENT_PROCESS
+        attached = ctypes.windll.kernel32.AttachConsole(-1)
+    except AttributeError:
+        attached = False
+    # 从资源管理器启动等没有父控制台时丢弃输出，避免写入时出错
+    target = "CONOUT$" if attached else os.devnull
+    if sys.stdout is None:
+        sys.stdout = open(target, 'w', errors="replace")
+    if sys.stderr is None:
+        sys.stderr = open(target, 'w', errors="replace")
+
+def run_cli(argv):
+    """处理无界面的命令行子命令，返回退出码；不是子命令时返回None"""
+    if len(argv) < 2 or argv[1] not in ("simulate", "history", "stress", "exit-watch", "memory", "scheduler",
+                                        "agent", "remote"):
+        return None
+    attach_parent_console()
+    import argparse
+    if argv[1] in ("agent", "remote"):
+        parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} {argv[1]}",
+                                         description="远程代理" if argv[1] == "agent" else "向远程代理下发命令")
+        parser.add_argument("--secret", default=os.environ.get("LAUNCHER_AGENT_SECRET"),
+                            help="共享密钥，默认读取LAUNCHER_AGENT_SECRET环境变量")
+        if argv[1] == "agent":
+            parser.add_argument("--config", default=CONFIG_FILE, help="配置文件")
+            parser.add_argument("--host", default="127.0.0.1", help="监听地址，局域网使用时设为0.0.0.0")
+            parser.add_argument("--port", type=int, default=AGENT_DEFAULT_PORT, help="监听端口")
+        else:
+            parser.add_argument("command", choices=AGENT_COMMANDS)
+            parser.add_argument("agents", nargs="+", help="代理地址，格式为 主机:端口")
+            parser.add_argument("--timeout", type=float, default=120, help="等待每个代理结果的最长时间(秒)")
+            parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+        args = parser.parse_args(argv[2:])
+        if not args.secret:
+            parser.error("需要共享密钥 (--secret 或 LAUNCHER_AGENT_SECRET)")
+        if argv[1] == "agent":
+            LauncherAgent(args.config, args.secret, args.host, args.port).serve_forever()
+            return 0
+        results = fan_out_agents(args.agents, args.secret, args.command, args.timeout)
+        if args.json:
+            print(json.dumps({address: result or {"ok": False, "error": error}
+                              for address, (result, error) in results.items()}, ensure_ascii=False, indent=2))
+        else:
+            print(format_agent_results(results))
+        return 0 if all(result and result.get("ok") for result, _ in results.values()) else 1
+    if argv[1] == "history":
+        parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} history",
+                                         description="查看启动和关闭耗时统计")
+        parser.add_argument("--history", default=HISTORY_FILE, help="启动历史数据库")
+        parser.add_argument("--path", help="只显示指定程序")
+        parser.add_argument("--days", type=int, default=30, help="趋势统计的天数")
+        args = parser.parse_args(argv[2:])
+        return run_history_report(args.history, args.path, args.days)
+    if argv[1] == "exit-watch":
+        parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} exit-watch",
+                                         description="进程退出监视器自检")
+        parser.add_argument("--selftest", action="store_true", required=True, help="运行自检")
+        parser.add_argument("--idle", type=float, default=2.0, help="空闲观察时长(秒)")
+        parser.add_argument("--max-wakeups", type=int, default=0, help="空闲期间允许的唤醒次数")
+        args = parser.parse_args(argv[2:])
+        return run_exit_watch_selftest(args.idle, args.max_wakeups)
+    if argv[1] == "memory":
+        parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} memory",
+                                         description="比较隐藏到托盘时普通模式和低内存模式的常驻内存")
+        parser.add_argument("--selftest", action="store_true", help="运行自检")
+        parser.add_argument("--measure", choices=MEMORY_MODES, help=argparse.SUPPRESS)
+        parser.add_argument("--rows", type=int, default=60, help="配置中的程序行数")
+        args = parser.parse_args(argv[2:])
+        if args.measure:
+            print(json.dumps({"rss": measure_tray_memory(args.measure.startswith("low"), args.rows,
+                                                         args.measure.endswith("shown"))}))
+            return 0
+        if not args.selftest:
+            parser.error("需要 --selftest")
+        return run_memory_selftest(args.rows)
+    if argv[1] == "scheduler":
+        parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} scheduler",
+                                         description="周期任务调度器在窗口隐藏时的唤醒次数自检")
+        parser.add_argument("--selftest", action="store_true", required=True, help="运行自检")
+        parser.add_argument("--span", type=float, default=60.0, help="运行时长(秒)")
+        parser.add_argument("--max-per-minute", type=float, default=6, help="每分钟允许的唤醒次数")
+        args = parser.parse_args(argv[2:])
+        return run_scheduler_selftest(args.span, args.max_per_minute)
+    if argv[1] == "stress":
+        parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} stress",
+                                         description="用合成的进程表测试关闭和进程选择的耗时")
+        parser.add_argument("--sizes", default="1000,10000,50000", help="进程表规模，逗号分隔")
+        parser.add_argument("--collisions", type=int, default=10, help="与目标程序同名的进程数")
+        parser.add_argument("--depth", type=int, default=8, help="进程树深度")
+        parser.add_argument("--scan-budget", type=float, default=250, help="每1万进程允许的扫描耗时(毫秒)")
+        parser.add_argument("--picker-budget", type=float, default=2000, help="每1万进程允许的对话框加载耗时(毫秒)")
+        parser.add_argument("--filter-budget", type=float, default=300, help="每1万进程允许的单次按键过滤耗时(毫秒)")
+        parser.add_argument("--close-budget", type=float, default=1000, help="每1万进程允许的关闭耗时(毫秒)")
+        parser.add_argument("--output", help="把结果以JSON写入文件")
+        args = parser.parse_args(argv[2:])
+        budgets = {"scan": args.scan_budget, "picker": args.picker_budget,
+                   "filter": args.filter_budget, "close": args.close_budget}
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+        return run_stress(sizes, args.collisions, args.depth, budgets, output=args.output)
+    parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} simulate",
+                                     description="用记录的启动耗时模拟不同调度策略")
+    parser.add_argument("--config", default=CONFIG_FILE, help="配置文件")
+    parser.add_argument("--trace", help="启动耗时跟踪文件(JSON)，默认使用启动历史")
+    parser.add_argument("--history", default=HISTORY_FILE, help="启动历史数据库")
+    parser.add_argument("--max-parallel", type=int, default=4, help="并行启动数的最大尝试值")
+    parser.add_argument("--capacity", type=float, help="可同时全速启动的程序数，默认CPU核心数")
+    parser.add_argument("--output", help="同时把结果写入文件")
+    args = parser.parse_args(argv[2:])
+    return run_simulation(args.config, args.trace, args.max_parallel, args.capacity, args.history, args.output)
 
 def main():
+    # 无界面子命令
+    exit_code = run_cli(sys.argv)
+    if exit_code is not None:
+        sys.exit(exit_code)
+    
+    # 诊断开关，提权重新运行时参数会原样传递
+    parse_diagnostic_options(sys.argv)
+    start_tracemalloc()
+    
+    # 本地套接字和消息框都需要先创建QApplication
+    app = QApplication(sys.argv)
+    
+    # 已有实例在运行时只转发命令，不再重复提权和创建窗口
+    command = parse_instance_command(sys.argv)
+    if send_to_running_instance(command):
+        sys.exit(0)
+    
     # 检查管理员权限
     if not is_admin():
         if not run_as_admin():
-            app = QApplication(sys.argv)
             QMessageBox.critical(None, "权限错误", "需要管理员权限才能运行此程序")
             sys.exit(1)
         else:
@@ -1091,7 +4887,6 @@ def main():
     # 检查依赖
     check_dependencies()
     
-    app = QApplication(sys.argv)
     app.setStyle("Fusion")
     
     # 设置应用字体
@@ -1105,7 +4900,12 @@ def main():
     # 创建主窗口
     window = MainWindow()
     window.resize(900, 600)
-    window.show()
+    take_memory_snapshot("startup")
+    if command == "show":
+        window.show_window()
+    else:
+        # 带命令启动时常驻托盘并直接执行
+        window.handle_instance_command(command)
     
     sys.exit(app.exec_())
 